@@ -0,0 +1,108 @@
+"""Flask apps used by the benchmarks, built from generated models.
+
+They also run on the older trees `run.py --against` checks out: the endpoints and
+options of features a tree does not have yet are left out, see `supports`.
+"""
+import inspect
+from typing import Any, List, Type
+from flask import Flask
+from pydantic import BaseModel, create_model
+from openapi import OpenApi
+from openapi.validator import FileStorage
+
+
+def supports(func: Any, option: str) -> bool:
+    """Whether func (`OpenApi`, `OpenApi.swagger`...) of the benchmarked tree takes option."""
+    return option in inspect.signature(func).parameters
+
+
+def build_doc(openapi: OpenApi) -> Any:
+    """The document built from the operations, not served from the cache of the trees that have one."""
+    invalidate = getattr(openapi, 'invalidate_api_doc', None)
+    if invalidate is not None:
+        invalidate()
+    return openapi.api_doc_asset if hasattr(type(openapi), 'api_doc_asset') else openapi.api_doc
+
+
+def make_model(name: str, fields: int, type_=str) -> Type[BaseModel]:
+    return create_model(name, **{f'f{i}': (type_, ...) for i in range(fields)})
+
+
+def query_string(fields: int) -> str:
+    return '&'.join(f'f{i}={i}' for i in range(fields))
+
+
+def make_request_app(fields: int, **openapi_kwargs) -> Flask:
+    """One endpoint per request part, each with a model of `fields` fields.
+
+    ``/trusted_items`` is only registered when the tree supports ``swagger(trusted=...)``.
+    """
+    app = Flask(__name__)
+    openapi = OpenApi(app, **openapi_kwargs)
+    Query = make_model(f'Query{fields}', fields)
+    Body = make_model(f'Body{fields}', fields, int)
+    Form = make_model(f'Form{fields}', fields)
+    Path = create_model('Path', id=(int, ...), name=(str, ...))
+    Upload = create_model('Upload', name=(str, ...), file=(FileStorage, ...))
+    Items = create_model('Items', items=(List[Body], ...))
+
+    @app.get('/query')
+    @openapi.swagger()
+    def query(query: Query):
+        return {}
+
+    @app.get('/path/<int:id>/<name>')
+    @openapi.swagger()
+    def path(path: Path):
+        return {}
+
+    @app.post('/body')
+    @openapi.swagger()
+    def body(body: Body):
+        return {}
+
+    @app.post('/items')
+    @openapi.swagger()
+    def items(body: Items):
+        return {}
+
+    if supports(openapi.swagger, 'trusted'):
+        @app.post('/trusted_items')
+        @openapi.swagger(trusted=True)
+        def trusted_items(body: Items):
+            return {}
+
+    @app.post('/form')
+    @openapi.swagger()
+    def form(form: Form):
+        return {}
+
+    @app.post('/upload')
+    @openapi.swagger()
+    def upload(form: Upload):
+        return {}
+
+    openapi.register_swagger()
+    return app
+
+
+def make_routes_app(routes: int, fields: int = 5, **openapi_kwargs) -> OpenApi:
+    """`routes` documented endpoints, each group of ten shares its query, body and response models."""
+    app = Flask(__name__)
+    openapi = OpenApi(app, **openapi_kwargs)
+    Path = create_model('Path', id=(int, ...))
+    for i in range(routes):
+        if i % 10 == 0:
+            Query = make_model(f'Query{i}', fields)
+            Body = make_model(f'Body{i}', fields, int)
+            Response = make_model(f'Response{i}', fields)
+
+        def view(path: Path, query: Query, body: Body):
+            return {}
+
+        view.__name__ = f'view{i}'
+        view.__doc__ = f'Endpoint {i}\nsecond line'
+        app.add_url_rule(f'/r{i}/<int:id>', view_func=openapi.swagger(responses={'200': Response})(view),
+                         methods=['POST'])
+    openapi.register_swagger()
+    return openapi
@@ -0,0 +1,296 @@
+"""Benchmarks of request binding, spec generation, startup and memory.
+
+    python benchmarks/run.py --against main  # this tree against main, exit 1 on regression
+    python benchmarks/run.py                 # show the change from benchmarks/baseline.json
+    python benchmarks/run.py --save          # record the current numbers as the baseline
+    python benchmarks/run.py -k api_doc      # only the benchmarks whose name contains `api_doc`
+
+Times are the best of several repeats, in microseconds per operation, memory is
+the tracemalloc peak in KiB.
+
+The check is `--against`: the ``openapi`` package of a git ref and of this tree
+are benchmarked in turns, in fresh processes of the same session, and compared
+by their medians. A change fails only when it is larger than the noise measured
+between the rounds, and than `--tolerance`. A result only one of the trees has,
+a benchmark the older tree cannot run, is listed as not compared and fails too.
+
+Comparing with baseline.json never fails, unlike a failing baseline check: the
+stored numbers come from another session, maybe another machine, and even scaled
+by the pure python calibration loop they differ by more than the regressions we
+look for. It is informative only, use `--against` to gate a change.
+"""
+import io
+import os
+import sys
+import json
+import timeit
+import tarfile
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from statistics import median
+from typing import Callable, Dict, List
+
+# the package benchmarked, this tree or the checkout of a git ref for `--against`
+ROOT = os.environ.get('OPENAPI_BENCH_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from apps import make_request_app, make_routes_app, query_string, supports, build_doc  # noqa: E402
+from openapi import OpenApi  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+BENCHMARKS: Dict[str, Callable[[], dict]] = {}
+
+
+def benchmark(name: str):
+    def decorate(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorate
+
+
+def best_of(func: Callable[[], object], number: int, repeat: int = 7) -> float:
+    """Microseconds per call, best of repeat runs."""
+    func()  # warm up caches built on first use
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def calibrate() -> float:
+    """Microseconds of a fixed pure python workload, the speed of this machine."""
+    def work():
+        data = {str(i): [i] * 5 for i in range(2000)}
+        return sorted(json.dumps(data))
+    return best_of(work, 5)
+
+
+def peak_memory(func: Callable[[], object]) -> float:
+    """KiB allocated at the peak while func runs."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def _requests(fields: int) -> dict:
+    app = make_request_app(fields)
+    client = app.test_client()
+    qs = query_string(fields)
+    body = {f'f{i}': i for i in range(fields)}
+    form = {f'f{i}': str(i) for i in range(fields)}
+    items = {'items': [body] * 100}
+    assert client.get(f'/query?{qs}').status_code == 200
+    assert client.post('/body', json=body).status_code == 200
+    assert client.post('/form', data=form).status_code == 200
+    result = {
+        'query': best_of(lambda: client.get(f'/query?{qs}'), 500),
+        'body': best_of(lambda: client.post('/body', json=body), 500),
+        'form': best_of(lambda: client.post('/form', data=form), 300),
+        'items': best_of(lambda: client.post('/items', json=items), 50),
+    }
+    if 'trusted_items' in app.view_functions:
+        result['trusted_items'] = best_of(lambda: client.post('/trusted_items', json=items), 50)
+    return result
+
+
+@benchmark('request.small')
+def request_small() -> dict:
+    result = _requests(3)
+    client = make_request_app(3).test_client()
+    result['path'] = best_of(lambda: client.get('/path/1/name'), 500)
+    result['upload'] = best_of(
+        lambda: client.post('/upload', data={'name': 'a', 'file': (io.BytesIO(b'x' * 1024), 'a.txt')}), 300)
+    return result
+
+
+@benchmark('request.large')
+def request_large() -> dict:
+    return _requests(50)
+
+
+@benchmark('api_doc')
+def api_doc() -> dict:
+    result = {}
+    for routes, number in ((10, 50), (100, 5), (1000, 1)):
+        openapi = make_routes_app(routes)
+
+        result[f'routes_{routes}'] = best_of(lambda: build_doc(openapi), number, repeat=3)
+    return result
+
+
+@benchmark('startup')
+def startup() -> dict:
+    """Decorating the views and `register_swagger`, with the document built eagerly and lazily."""
+    result = {
+        'routes_100': best_of(lambda: make_routes_app(100), 1, repeat=3),
+        'routes_1000': best_of(lambda: make_routes_app(1000), 1, repeat=3),
+    }
+    if supports(OpenApi, 'lazy'):
+        result['lazy_routes_1000'] = best_of(lambda: make_routes_app(1000, lazy=True), 1, repeat=3)
+    return result
+
+
+@benchmark('memory')
+def memory() -> dict:
+    """Per worker: an app with its document built."""
+    return {
+        'routes_100_kib': peak_memory(lambda: build_doc(make_routes_app(100))),
+        'routes_1000_kib': peak_memory(lambda: build_doc(make_routes_app(1000))),
+    }
+
+
+def compare(results: dict, baseline: dict, speed: float) -> None:
+    """
+    :param speed: calibration of this machine relative to the one that recorded the baseline
+    """
+    for name, values in results.items():
+        for key, value in values.items():
+            base = baseline.get(name, {}).get(key)
+            if base is None:
+                continue
+            if not key.endswith('_kib'):
+                base *= speed
+            change = value / base - 1 if base else 0.0
+            print(f'{name}.{key:<20} {value:12.1f}  baseline {base:12.1f}  {change:+7.1%}')
+
+
+def run_benchmarks(keyword: str) -> dict:
+    """Results of the benchmarks matching keyword, the ones the benchmarked tree cannot run are skipped."""
+    results = {}
+    for name, func in BENCHMARKS.items():
+        if keyword in name:
+            try:
+                results[name] = func()
+            except Exception as e:  # noqa, a feature missing from an older tree
+                print(f'{name} skipped: {e!r}', file=sys.stderr)
+    return results
+
+
+def checkout(ref: str, directory: str) -> str:
+    """The ``openapi`` package of git ref extracted to directory."""
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    data = subprocess.run(['git', 'archive', '--format=tar', ref, 'openapi'], cwd=repo, check=True,
+                          stdout=subprocess.PIPE).stdout
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        tar.extractall(directory)
+    return directory
+
+
+def run_tree(root: str, keyword: str) -> dict:
+    """Results of one round on the package at root, in a fresh process."""
+    env = dict(os.environ, OPENAPI_BENCH_ROOT=root)
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--json', '-k', keyword], env=env,
+                         check=True, stdout=subprocess.PIPE).stdout
+    return json.loads(out)
+
+
+def _noise(samples: List[float]) -> float:
+    """Relative spread of samples, the median absolute deviation scaled to a standard deviation."""
+    center = median(samples)
+    if not center:
+        return 0.0
+    return 1.4826 * median(abs(x - center) for x in samples) / center
+
+
+def compare_rounds(old: List[dict], new: List[dict], tolerance: float, sigmas: float) -> tuple:
+    """Compare the medians of the rounds, a change must exceed both tolerance and sigmas times the noise.
+
+    Returns the regressions, and the results found in one of the trees only.
+    """
+    regressions, missing = [], []
+    keys = dict.fromkeys((name, key) for r in old + new for name, values in r.items() for key in values)
+    for name, key in keys:
+        before = [r[name][key] for r in old if key in r.get(name, {})]
+        after = [r[name][key] for r in new if key in r.get(name, {})]
+        if not before or not after:
+            missing.append(f'{name}.{key} ({"new" if after else "old"} tree only)')
+            continue
+        base, value = median(before), median(after)
+        change = value / base - 1 if base else 0.0
+        threshold = max(tolerance, sigmas * max(_noise(before), _noise(after)))
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(f'{name}.{key}')
+        print(f'{name}.{key:<20} {value:12.1f}  against {base:12.1f}  {change:+7.1%}  '
+              f'threshold {threshold:6.1%}{flag}')
+    return regressions, missing
+
+
+def against(ref: str, keyword: str, rounds: int, tolerance: float, sigmas: float) -> int:
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    old, new = [], []
+    with tempfile.TemporaryDirectory(prefix='openapi-bench-') as directory:
+        trees = ((checkout(ref, directory), old), (here, new))
+        for i in range(rounds):
+            # alternate which tree runs first, so a drift of the machine hits both
+            for root, results in (trees if i % 2 == 0 else trees[::-1]):
+                results.append(run_tree(root, keyword))
+            print(f'round {i + 1}/{rounds}', file=sys.stderr)
+    print(f'{rounds} rounds against {ref}, medians')
+    regressions, missing = compare_rounds(old, new, tolerance, sigmas)
+    if missing:
+        print(f'{len(missing)} not compared: {", ".join(missing)}')
+    if regressions:
+        print(f'{len(regressions)} regression(s): {", ".join(regressions)}')
+    return 1 if regressions or missing else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--save', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--against', metavar='REF', help='git ref benchmarked in the same session to compare with')
+    parser.add_argument('--rounds', type=int, default=5, help='runs of each tree with --against')
+    parser.add_argument('--tolerance', type=float, default=0.05,
+                        help='smallest slowdown reported as a regression with --against, 0.05 is 5%%')
+    parser.add_argument('--sigmas', type=float, default=3.0,
+                        help='a regression is also larger than this many times the noise between rounds')
+    parser.add_argument('--json', action='store_true', help='only print the results, used by --against')
+    parser.add_argument('-k', dest='keyword', default='', help='only run benchmarks whose name contains this')
+    args = parser.parse_args(argv)
+
+    if args.against:
+        return against(args.against, args.keyword, args.rounds, args.tolerance, args.sigmas)
+    if args.json:
+        print(json.dumps(run_benchmarks(args.keyword)))
+        return 0
+
+    calibration = calibrate()
+    results = run_benchmarks(args.keyword)
+    calibration = min(calibration, calibrate())
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        # a partial run keeps the other results, times are scaled to the stored calibration
+        scale = baseline['calibration'] / calibration if args.keyword and baseline.get('calibration') else 1.0
+        baseline['calibration'] = round(calibration * scale, 1)
+        baseline.update({
+            name: {k: round(v if k.endswith('_kib') else v * scale, 1) for k, v in values.items()}
+            for name, values in results.items()
+        })
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(json.dumps(results, indent=2))
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(json.dumps(results, indent=2))
+        print(f'no baseline at {args.baseline}, run with --save to record one')
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    speed = calibration / baseline['calibration'] if baseline.get('calibration') else 1.0
+    print(f'calibration {calibration:.1f}us, {speed:.2f}x the baseline machine, informative, '
+          f'use --against to check regressions')
+    compare(results, baseline, speed)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,63 +1,268 @@
 import os
 import json
-from functools import wraps
-from werkzeug.datastructures import MultiDict
-from pydantic import ValidationError
+import random
+import tempfile
+import inspect
+import hashlib
+import threading
+from time import perf_counter
+from functools import wraps, partial
+from collections.abc import Iterator
+from pydantic import BaseModel, ValidationError
 from .models import APISpec, Components, ExternalDocumentation, Info, SecurityScheme, Tag
-from flask import Blueprint, render_template, request, make_response
-from .until import parse_func_info, bind_rule_swagger, validate_response, get_operation, add_swagger_info
+from flask import Blueprint, Response, render_template, request, make_response, abort, stream_with_context
+from werkzeug.routing import Rule
+from .binder import Binder, HeaderBinder, CachedValidationError
+from .cache import LRUCache, ResponseCache
+from .limits import RequestLimits
+from .trusted import Trusted
+from .batch import Batch
+from .compat import validate, dump, errors
+from .registry import SchemaRegistry
+from .stream import Stream, StreamValidationError, NDJSON_MIMETYPES, is_stream, iter_json_chunks
+from .json_provider import get_json_provider
+from .compress import CompressedAsset, STATIC_CACHE_CONTROL, SUFFIXES, compress, load_static_assets
+from .until import parse_func_info, bind_rule, validate_response, get_operation, add_swagger_info, \
+    get_func_models, load_api_doc, add_cache_info, add_limits_info, blueprint_name, collect_schema_refs
+from .metrics import PrometheusMetrics, PROMETHEUS_MIMETYPE
+from .cli import openapi_cli
 
 
-def _do_wrapper(func, path=None, query=None, form=None, body=None, responses=None, **kwargs):
+def _load_json(json_provider, limits=None, model=None):
+    """Request json parsed once, `{}` when missing or invalid like `request.get_json(silent=True)`.
+
+    :param limits: `limits.RequestLimits`, the size is checked while reading, the shape once parsed
+    """
+    if not request.is_json:
+        return {}
+    if limits is not None and request.content_length is None and getattr(request, '_cached_data', None) is None:
+        # nothing was checked before reading, cached where `get_data` looks for it
+        request._cached_data = limits.read(request.stream)
+    data = request.get_data(cache=True)
+    if not data:
+        return {}
+    try:
+        try:
+            obj = json_provider.loads(data)
+        except ValueError:
+            if limits is None or limits.max_depth is None or json_provider.name == 'json':
+                raise
+            # orjson and ujson refuse 1024 levels of nesting as invalid json, json tells them apart
+            obj = json.loads(data)
+    except ValueError:
+        return {}
+    except RecursionError:
+        if limits is not None and limits.max_depth is not None:
+            raise limits.depth_error(model)
+        raise
+    if obj is None:
+        return {}
+    if limits is not None:
+        limits.check_json(obj, model)
+    return obj
+
+
+def _make_json_response(resp, json_provider):
+    """Serialize pydantic models returned by view-func with json_provider."""
+    if isinstance(resp, tuple) and resp and isinstance(resp[0], BaseModel):
+        return (_make_json_response(resp[0], json_provider),) + resp[1:]
+    if isinstance(resp, BaseModel):
+        resp = make_response(json_provider.dumps(dump(resp, by_alias=True)))
+        resp.mimetype = 'application/json'
+    return resp
+
+
+def _bind_request(path=None, query=None, form=None, body=None, json_provider=None, view_args=None,
+                  header=None, cookie=None, limits=None, trusted=None):
+    """Validate the request into view-func keyword arguments, raise `ValidationError`.
+
+    :param query: `binder.Binder` of the query model
+    :param form: `binder.Binder` of the form model
+    :param header: `binder.HeaderBinder` of the header model
+    :param cookie: `binder.Binder` of the cookie model
+    :param json_provider: `json_provider.JSONProvider`
+    :param limits: `limits.RequestLimits`, a body over max_body_size raises `RequestEntityTooLarge`
+    :param trusted: `trusted.Trusted`, the body of the requests it accepts is not validated
+    """
     kwargs_ = dict()
+    if limits is not None:
+        limits.check_content_length(request.content_length)
+        limits.check_query(request.query_string, request.args, query.model if query else BaseModel)
+    if path:
+        path_ = path(**view_args)
+        kwargs_.update({"path": path_})
+    if query:
+        query_ = query.cached(request.query_string, request.args)
+        kwargs_.update({"query": query_})
+    if form:
+        if form.stream_factory is not None:
+            request._get_file_stream = form.stream_factory
+        form_ = form(request.form, request.files)
+        kwargs_.update({"form": form_})
+    if is_stream(body):
+        stream = limits.limit_stream(request.stream) if limits is not None else request.stream
+        body_ = body(stream, ndjson=request.mimetype in NDJSON_MIMETYPES, loads=json_provider.loads,
+                     max_items=limits.max_items if limits is not None else None,
+                     max_item_size=limits.max_item_size if limits is not None else None)
+        kwargs_.update({"body": body_})
+    elif body:
+        obj = _load_json(json_provider, limits, body)
+        if trusted is not None and trusted.accepts(request.get_data(cache=True)):
+            body_ = trusted.construct(body, obj)
+        else:
+            body_ = validate(body, obj)
+        kwargs_.update({"body": body_})
+    if header:
+        header_ = header(request.environ)
+        kwargs_.update({"header": header_})
+    if cookie:
+        cookie_ = cookie(request.cookies)
+        kwargs_.update({"cookie": cookie_})
+    return kwargs_
+
+
+def _validation_error_response(e, json_provider):
+    return _errors_response(errors(e), json_provider)
+
+
+def _errors_response(errors_, json_provider):
+    resp = make_response(json_provider.dumps(errors_), 422)
+    resp.headers['Content-Type'] = 'application/json'
+    return resp
+
+
+def _stream_response(resp, model, validate, json_provider, metrics=None):
+    """Stream the items of a generator returned by view-func as a json array or ndjson.
+
+    An invalid `Stream` body read by the generator ends the items with an error record.
+    """
+    status, headers = 200, None
+    if isinstance(resp, tuple):
+        resp, status, headers = (resp + (None,))[:3]
+    if is_stream(model):
+        model = model.model
+    ndjson = request.accept_mimetypes.best_match(('application/json',) + NDJSON_MIMETYPES) in NDJSON_MIMETYPES
+    chunks = iter_json_chunks(resp, json_provider.dumps, model, ndjson=ndjson, validate=validate,
+                              on_error=metrics.observe_validation_error if metrics is not None else None)
+    return Response(
+        stream_with_context(chunks),
+        status=status,
+        headers=headers,
+        mimetype=NDJSON_MIMETYPES[0] if ndjson else 'application/json'
+    )
+
+
+def _after_request(resp, responses=None, validate_rate=0.0, json_provider=None, metrics=None, start=0.0):
+    """
+    :param validate_rate: fraction of the responses validated against `responses`
+    :param metrics: `metrics.MetricsSink`, timing started at start
+    """
+    validate = bool(responses and validate_rate and (validate_rate >= 1 or random.random() < validate_rate))
+    result = resp[0] if isinstance(resp, tuple) and resp else resp
+    if responses and isinstance(result, Iterator) and responses.get('200'):
+        resp = _stream_response(resp, responses['200'], validate, json_provider, metrics)
+        if metrics is not None:
+            metrics.observe('serialize', start)
+        return resp
+
+    if validate:
+        validate_response(resp, responses, request.endpoint)
+        if metrics is not None:
+            start = metrics.observe('validate_response', start)
+
+    resp = _make_json_response(resp, json_provider)
+    if metrics is not None:
+        metrics.observe('serialize', start)
+    return resp
+
+
+def _error_response(e, json_provider, metrics=None):
+    """422 response of a `ValidationError` or `binder.CachedValidationError`"""
+    errors_ = e.errors if isinstance(e, CachedValidationError) else errors(e)
+    if metrics is not None:
+        metrics.observe_errors(errors_)
+    return _errors_response(errors_, json_provider)
+
+
+def _before_view(kwargs, path=None, query=None, form=None, body=None, json_provider=None, header=None, cookie=None,
+                 cache=None, metrics=None, limits=None, trusted=None):
+    """Bind the request and look it up in cache.
+
+    :return: ``(resp, kwargs_, key, start)``, resp is returned instead of calling view-func
+             when the request is invalid or cached
+    """
+    start = perf_counter() if metrics is not None else 0.0
     try:
-        if path:
-            path_ = path(**kwargs)
-            kwargs_.update({"path": path_})
-        if query:
-            args = request.args or MultiDict()
-            args_dict = {}
-            for k, v in query.schema().get('properties', {}).items():
-                if k not in args:
-                    continue
-                if v.get('type') == 'array':
-                    args_dict[k] = args.getlist(k)
-                else:
-                    args_dict[k] = args.get(k)
-            query_ = query(**args_dict)
-            kwargs_.update({"query": query_})
-        if form:
-            req_form = request.form or MultiDict()
-            form_dict = {}
-            for k, v in form.schema().get('properties', {}).items():
-                if k not in req_form:
-                    continue
-                if v.get('type') == 'array':
-                    form_dict[k] = req_form.getlist(k)
-                else:
-                    form_dict[k] = req_form.get(k)
-            form_dict.update(**request.files.to_dict())
-            form_ = form(**form_dict)
-            kwargs_.update({"form": form_})
-        if body:
-            body_ = body(
-                **request.get_json(silent=True) if request.get_json(silent=True) is not None else {})
-            kwargs_.update({"body": body_})
-    except ValidationError as e:
-        resp = make_response(e.json(), 422)
-        resp.headers['Content-Type'] = 'application/json'
+        kwargs_ = _bind_request(path, query, form, body, json_provider, kwargs, header, cookie, limits,
+                                trusted)
+    except (ValidationError, CachedValidationError) as e:
+        return _error_response(e, json_provider, metrics), None, None, start
+    if metrics is not None:
+        start = metrics.observe('bind', start)
+
+    key = None
+    if cache is not None:
+        key = cache.key(kwargs_)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached, kwargs_, key, start
+    return None, kwargs_, key, start
+
+
+def _after_view(resp, kwargs_, key, start, responses=None, validate_rate=0.0, json_provider=None, cache=None,
+                metrics=None):
+    if metrics is not None:
+        start = metrics.observe('view', start)
+    resp = _after_request(resp, responses, validate_rate, json_provider, metrics, start)
+    return cache.set(key, resp, kwargs_) if cache is not None else resp
+
+
+def _do_wrapper(func, path=None, query=None, form=None, body=None, responses=None, validate_rate=0.0,
+                json_provider=None, header=None, cookie=None, cache=None, metrics=None, limits=None, trusted=None,
+                **kwargs):
+    """
+    :param cache: `cache.ResponseCache`
+    :param limits: `limits.RequestLimits`
+    :param trusted: `trusted.Trusted`
+    :param metrics: `metrics.MetricsSink`, None skips all timing
+    """
+    resp, kwargs_, key, start = _before_view(kwargs, path, query, form, body, json_provider, header, cookie,
+                                             cache, metrics, limits, trusted)
+    if resp is not None:
         return resp
+    try:
+        resp = func(**kwargs_)
+    except StreamValidationError as e:
+        return _error_response(e, json_provider, metrics)
+    return _after_view(resp, kwargs_, key, start, responses, validate_rate, json_provider, cache, metrics)
 
-    resp = func(**kwargs_)
 
-    if responses:
-        validate_response(resp, responses)
+async def _do_async_wrapper(func, path=None, query=None, form=None, body=None, responses=None, validate_rate=0.0,
+                            json_provider=None, header=None, cookie=None, cache=None, metrics=None,
+                            limits=None, trusted=None, **kwargs):
+    """`_do_wrapper` for `async def` view-func"""
+    resp, kwargs_, key, start = _before_view(kwargs, path, query, form, body, json_provider, header, cookie,
+                                             cache, metrics, limits, trusted)
+    if resp is not None:
+        return resp
+    try:
+        resp = await func(**kwargs_)
+    except StreamValidationError as e:
+        return _error_response(e, json_provider, metrics)
+    return _after_view(resp, kwargs_, key, start, responses, validate_rate, json_provider, cache, metrics)
 
-    return resp
+
+def _write_file(filename, data):
+    """Write atomically, a worker mapping the previous file keeps its pages."""
+    tmp = f'{filename}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, filename)
 
 
 class OpenApi:
-    def __init__(self, app=None, api_name='openapi', secutity=None):
+    def __init__(self, app=None, api_name='openapi', secutity=None, precompress=False, api_doc_file=None,
+                 lazy=False, validate_response=False, json_provider=None, metrics=None, batch=None):
         self.app = app
         self.tags = []
         self.api_name = api_name
@@ -65,14 +270,38 @@ class OpenApi:
         self.info = Info(title='OpenAPI', version='1.0.0')
         self.api_doc_url = f'/{self.api_name}.json'
         self.components = Components()
-        self.components_schemas = {}
+        self.components_schemas = SchemaRegistry()
         self.externalDocs = ExternalDocumentation(
             url=f'/{self.api_name}/markdown',
             description='Export to markdown')
-        self.paths = dict()
+        self._shards = {}  # blueprint name -> openapi paths of its rules, '' for the app's own routes
+        self._shard_paths = {}  # blueprint name -> serialized paths
+        self._shard_assets = {}  # blueprint name -> serialized shard document
+        self._shard_files = {}  # blueprint name -> document file, written by `freeze` or found by `_shard_file`
         self.securitySchemes = secutity
         self.docExpansion = 'list'
         self.oauth_config = dict()
+        self.api_doc_cache_control = 'public, no-cache'
+        self._api_doc_cache = None
+        self.precompress = precompress
+        self.api_doc_file = api_doc_file  # prebuilt document, schema generation is skipped
+        self.lazy = lazy  # build operations on first access to the document
+        self._pending_operations = []
+        self._pending_rules = []  # url rules added since the last `_bind_rules`
+        self._rescan_rules = False
+        self._hooked_app = None
+        # held while operations are built, rules bound and documents assembled, reentrant as they nest
+        self._lock = threading.RLock()
+        # True, False or the fraction of responses validated, overridden by `swagger(validate_response=...)`
+        self.validate_response_rate = float(validate_response)
+        # 'json', 'orjson', 'ujson', 'auto' or a `json_provider.JSONProvider` instance
+        self.json_provider = get_json_provider(json_provider)
+        # True for `metrics.PrometheusMetrics`, or a `metrics.MetricsSink` instance
+        self.metrics = PrometheusMetrics() if metrics is True else metrics or None
+        # True for `batch.Batch` defaults, or a `batch.Batch` instance serving ``/<api_name>/batch``
+        self.batch = Batch() if batch is True else batch or None
+        self._static_assets = {}
+        self._static_query = ''
         if self.app:
             self.register_swagger_html()
 
@@ -93,17 +322,49 @@ class OpenApi:
             __name__,
             url_prefix=f'/{self.api_name}',
             template_folder=template_folder,
-            static_folder=static_folder
+            static_folder=None if self.precompress else static_folder
         )
+        if self.precompress:
+            # serve gzip/brotli variants built once at startup, instead of flask's static handler
+            self._static_assets = load_static_assets(static_folder)
+            etags = ''.join(asset.etag for asset in self._static_assets.values())
+            self._static_query = '?v=' + hashlib.sha256(etags.encode()).hexdigest()[:12]
+            blueprint.add_url_rule(
+                rule='/static/<path:filename>',
+                endpoint='static',
+                view_func=self.static_view
+            )
         blueprint.add_url_rule(
             rule=self.api_doc_url,
             endpoint=self.api_name,
-            view_func=lambda: self.api_doc
+            view_func=self.api_doc_view
         )
+        blueprint.add_url_rule(
+            rule='/blueprints/<name>.json',
+            endpoint='blueprint_doc',
+            view_func=self.blueprint_doc_view
+        )
+        if self.batch is not None:
+            blueprint.add_url_rule(
+                rule='/batch',
+                endpoint='batch',
+                view_func=self.batch_view,
+                methods=['POST']
+            )
+        if hasattr(self.metrics, 'render'):
+            blueprint.add_url_rule(
+                rule='/metrics',
+                endpoint='metrics',
+                view_func=self.metrics_view
+            )
         blueprint.add_url_rule(
             rule='/redoc',
             endpoint='redoc',
-            view_func=lambda: render_template("redoc.html", api_doc_url=f'{self.api_name}.json')
+            view_func=lambda: render_template(
+                "redoc.html",
+                api_doc_url=f'{self.api_name}.json',
+                static_query=self._static_query
+            )
         )
         blueprint.add_url_rule(
             rule='/swagger',
@@ -112,7 +373,8 @@ class OpenApi:
                 "swagger.html",
                 api_doc_url=f'{self.api_name}.json',
                 docExpansion=self.docExpansion,
-                oauth_config=self.oauth_config.dict() if self.oauth_config else None
+                static_query=self._static_query,
+                oauth_config=dump(self.oauth_config) if self.oauth_config else None
             )
         )
         blueprint.add_url_rule(
@@ -126,40 +388,380 @@ class OpenApi:
             view_func=lambda: render_template("index.html")
         )
         self.app.register_blueprint(blueprint)
+        self.app.extensions.setdefault('openapi', {})[self.api_name] = self
+        self.app.cli.add_command(openapi_cli)
+        self._hook_app()
+
+    def _hook_app(self):
+        """Bind each url rule to its operation when it is added, instead of rescanning `url_map`.
+
+        `url_map.add` records the new rules, `add_url_rule` (used by ``app.route``,
+        blueprints and flask-restful) binds them once their view-func is registered.
+        """
+        app = self.app
+        if self.api_doc_file or self._hooked_app is app:
+            return
+        self._hooked_app = app
+        self._pending_rules.extend(app.url_map.iter_rules())
+        map_add, add_url_rule = app.url_map.add, app.add_url_rule
+
+        def add(rulefactory):
+            map_add(rulefactory)
+            if isinstance(rulefactory, Rule):
+                self._pending_rules.append(rulefactory)
+            else:  # Submount, Subdomain... add copies of their rules
+                self._rescan_rules = True
+            self.invalidate_api_doc()  # rules added without `add_url_rule` are bound on next access
+
+        @wraps(add_url_rule)
+        def hooked_add_url_rule(*args, **kwargs):
+            result = add_url_rule(*args, **kwargs)
+            if self.lazy:
+                self.invalidate_api_doc()  # bound with the operations on first access
+            else:
+                self._bind_rules()
+            return result
+
+        app.url_map.add = add
+        app.add_url_rule = hooked_add_url_rule
+        if not self.lazy:
+            self._bind_rules()
+
+    def _bind_rules(self):
+        """Bind the rules added since the last call, rules without view-func yet are kept for later."""
+        with self._lock:
+            if self.api_doc_file:
+                self._pending_rules = []
+                return
+            if self._rescan_rules:
+                self._rescan_rules = False
+                self._pending_rules = list(self.app.url_map.iter_rules())
+            rules, self._pending_rules = self._pending_rules, []
+            view_functions = self.app.view_functions
+            for rule in rules:
+                func = view_functions.get(rule.endpoint)
+                if func is None:
+                    self._pending_rules.append(rule)
+                    continue
+                name = blueprint_name(rule.endpoint)
+                paths = self._shards.get(name, {})
+                if bind_rule(rule, func, paths):
+                    self._shards[name] = paths
+                    self.invalidate_api_doc(name)
 
     @property
     def api_doc(self):
-        spec = APISpec(
-            openapi=self.openapi_version,
-            info=self.info,
-            externalDocs=self.externalDocs
-        )
-        # spec.tags = self.tags or None
-        spec.paths = self.paths
+        return self.json_provider.loads(bytes(self.api_doc_asset.data))
+
+    @property
+    def paths(self):
+        """Openapi paths of every blueprint"""
+        return {uri: item for paths in self._shards.values() for uri, item in paths.items()}
+
+    @property
+    def api_doc_asset(self):
+        """Serialized openapi document, assembled from the cached blueprint shards until invalidated."""
+        asset = self._api_doc_cache
+        if asset is not None:
+            return asset
+        with self._lock:
+            if self._api_doc_cache is None and self.api_doc_file:
+                self._api_doc_cache = self._load_doc_file(self.api_doc_file)
+            if self._api_doc_cache is None:
+                self._build_pending()
+                paths = {}
+                for name in list(self._shards):
+                    for uri, item in self._serialized_paths(name).items():
+                        # a path may have methods in several blueprints
+                        paths[uri] = {**paths[uri], **item} if uri in paths else item
+                self._api_doc_cache = self._make_doc_asset(paths, self._serialized_schemas())
+            return self._api_doc_cache
+
+    def blueprint_doc_asset(self, name):
+        """Serialized openapi document of the routes of one blueprint and the schemas they reference."""
+        asset = self._shard_assets.get(name)
+        if asset is not None:
+            return asset
+        with self._lock:
+            asset = self._shard_assets.get(name)
+            if asset is None and self.api_doc_file:
+                asset = self._shard_assets[name] = self._load_doc_file(self._shard_file(name))
+            if asset is None:
+                self._build_pending()
+                if name not in self._shards:
+                    raise KeyError(name)
+                paths = self._serialized_paths(name)
+                schemas = collect_schema_refs(paths, self._serialized_schemas())
+                asset = self._shard_assets[name] = self._make_doc_asset(paths, dict(sorted(schemas.items())))
+            return asset
+
+    def _shard_file(self, name):
+        """Document file of a blueprint, ``<root>.<name><ext>`` next to api_doc_file as `freeze` writes it."""
+        filename = self._shard_files.get(name)
+        if filename is None:
+            root, ext = os.path.splitext(self.api_doc_file)
+            filename = f'{root}.{name}{ext}'
+            if not name or os.sep in name or (os.altsep and os.altsep in name) or not os.path.isfile(filename):
+                raise KeyError(name)
+            self._shard_files[name] = filename
+        return filename
+
+    def _load_doc_file(self, filename):
+        """json documents are memory mapped, yaml ones are converted to json in memory."""
+        if os.path.splitext(filename)[1] in ('.yaml', '.yml'):
+            data = load_api_doc(filename)
+            variants = compress(data) if self.precompress else None
+            return CompressedAsset(data, 'application/json', variants=variants)
+        return CompressedAsset.from_mmap(filename, 'application/json', self.precompress)
+
+    def freeze(self, filename=None):
+        """Build the documents once and serve them from read-only memory mapped files.
+
+        Call it after every route is registered, e.g. at the end of the app module with
+        gunicorn ``preload_app``: the master writes the combined document to filename
+        (and each blueprint shard next to it), drops the pydantic spec objects, and the
+        forked workers share the mapped pages instead of each building and holding a copy.
+        Routes added afterwards are served but not documented.
+        Without preload, export the documents at build time (``flask openapi export -o``
+        writes the same files) and pass the combined one as `api_doc_file`, the blueprint
+        files next to it are found by name.
+
+        :param filename: json file, a temporary file by default
+        :return: filename
+        """
+        assert not self.api_doc_file, "`api_doc_file` is set, the document is already prebuilt."
+        if filename is None:
+            fd, filename = tempfile.mkstemp(prefix=f'{self.api_name}-', suffix='.json')
+            os.close(fd)
+        for name, path, asset in self.doc_files(filename):
+            if name:
+                self._shard_files[name] = path
+            _write_file(path, asset.data)
+            for encoding, data in asset.variants.items():
+                _write_file(path + SUFFIXES[encoding], data)
+
+        self.api_doc_file = filename
+        self.invalidate_api_doc()
+        self._shards = {}
+        self._pending_rules = []
+        self.components_schemas = SchemaRegistry()
+        self.components.schemas = None
+        for func in self._view_funcs():
+            for f in (func, getattr(func, '__wrapped__', None)):
+                if f is not None:
+                    f.__dict__.pop('operation', None)
+        return filename
+
+    def doc_files(self, filename):
+        """``(blueprint name, file, document)`` of the combined document, name '', and of each
+        blueprint shard, in ``<root>.<name><ext>`` next to filename where `_shard_file` finds it.
+        """
+        files = [('', filename, self.api_doc_asset)]
+        root, ext = os.path.splitext(filename)
+        for name in list(self._shards):
+            if name:
+                files.append((name, f'{root}.{name}{ext}', self.blueprint_doc_asset(name)))
+        return files
+
+    def _view_funcs(self):
+        for func in self.app.view_functions.values():
+            view_class = getattr(func, 'view_class', None)
+            if view_class is None:
+                yield func
+                continue
+            for klass in view_class.__mro__:
+                for method in vars(klass).values():
+                    if getattr(method, '_swagger', False):
+                        yield method
+
+    def _serialized_paths(self, name):
+        paths = self._shard_paths.get(name)
+        if paths is None:
+            paths = self._shard_paths[name] = {uri: item.to_dict() for uri, item in self._shards[name].items()}
+        return paths
+
+    def _serialized_schemas(self):
+        """`Components.schemas`, stored serialized"""
+        return dict(self.components_schemas)
+
+    def _make_doc_asset(self, paths, schemas):
         self.components.schemas = self.components_schemas
         self.components.securitySchemes = self.securitySchemes
-        spec.components = self.components
-        return json.loads(spec.json(by_alias=True, exclude_none=True))
+        components = dump(self.components, by_alias=True, exclude_none=True, exclude={'schemas'})
+        doc = {
+            "openapi": self.openapi_version,
+            "info": dump(self.info, by_alias=True, exclude_none=True),
+            "paths": paths,
+            "components": {"schemas": schemas, **components},
+        }
+        if self.externalDocs is not None:
+            doc["externalDocs"] = dump(self.externalDocs, by_alias=True, exclude_none=True)
+        data = self.json_provider.dumps(doc)
+        variants = compress(data) if self.precompress else None
+        return CompressedAsset(data, 'application/json', variants=variants)
+
+    def validate_api_doc(self):
+        """Validate the document against the `models` pydantic classes, raise `ValidationError`."""
+        return validate(APISpec, self.api_doc)
+
+    def invalidate_api_doc(self, blueprint=None):
+        """Drop the cached documents, they are rebuilt on the next request.
+
+        :param blueprint: only drop the combined document and the shard of this blueprint
+        """
+        self._api_doc_cache = None
+        if blueprint is None:
+            self._shard_paths.clear()
+            self._shard_assets.clear()
+        else:
+            self._shard_paths.pop(blueprint, None)
+            self._shard_assets.pop(blueprint, None)
+
+    def api_doc_view(self):
+        return self.api_doc_asset.make_response(self.api_doc_cache_control)
+
+    def blueprint_doc_view(self, name):
+        if not name:
+            abort(404)
+        try:
+            asset = self.blueprint_doc_asset(name)
+        except KeyError:
+            abort(404)
+        return asset.make_response(self.api_doc_cache_control)
+
+    def metrics_view(self):
+        return Response(self.metrics.render(), content_type=PROMETHEUS_MIMETYPE)
+
+    def batch_view(self):
+        try:
+            subs = self.batch.parse(_load_json(self.json_provider))
+        except ValidationError as e:
+            return _validation_error_response(e, self.json_provider)
+        return self.batch.run(subs, self.json_provider)
+
+    def static_view(self, filename):
+        asset = self._static_assets.get(filename)
+        if asset is None:
+            abort(404)
+        return asset.make_response(STATIC_CACHE_CONTROL)
+
+    def swagger(self, tags=None, responses=None, security=None, validate_response=None,
+                query_cache=None, query_cache_ttl=None, cache=None, limits=None, trusted=None):
+        """
+        :param cache: seconds or `cache.ResponseCache` caching whole responses, exposed as `view.cache`
+        :param limits: `limits.RequestLimits` checked before the request is validated
+        :param trusted: True or `trusted.Trusted`, callers whose json body is built without validation
+        :param query_cache: maxsize or `cache.LRUCache` caching validated query models by raw query
+                            string, exposed as `view.query_cache`
+        :param query_cache_ttl: seconds a cached query model is reused
+        """
+        if cache is True:
+            response_cache = ResponseCache()
+        elif isinstance(cache, (int, float)) and cache:
+            response_cache = ResponseCache(cache)
+        else:
+            response_cache = cache or None
+        if response_cache is not None:
+            schemes = self._security_schemes(security)
+            if schemes:
+                # per user, the credentials are part of the key
+                response_cache = response_cache.secured(schemes)
+        if trusted is True:
+            trusted = Trusted()
 
-    def swagger(self, tags=None, responses=None, security=None):
         def decorate(func):
             func._swagger = True
-            operation = get_operation(func)
-            if security or self.securitySchemes:
-                operation.security = security if security else [self.securitySchemes]
-            query, body, path, form = parse_func_info(func, self.components_schemas, operation)
-            add_swagger_info(self.components_schemas, responses, tags, operation)
+            query, body, path, form, header, cookie = get_func_models(func)
+            if not self.lazy and not self.api_doc_file:
+                self._build_operation(func, tags, responses, security, response_cache, limits)
+            if isinstance(query_cache, int) and query_cache:
+                models_cache = LRUCache(query_cache, query_cache_ttl)
+            else:
+                models_cache = query_cache or None
+            query = Binder(query, models_cache) if query else None
+            form = Binder(form) if form else None
+            # the key is built from the validated models, streams and files have no stable value
+            assert response_cache is None or not (is_stream(body) or (form and form.file_fields)), \
+                f"`cache` cannot be used on {func.__name__}, its body is a stream or its form has files."
+            header = HeaderBinder(header) if header else None
+            cookie = Binder(cookie) if cookie else None
+
+            is_async = inspect.iscoroutinefunction(func)
+            do_wrapper = partial(_do_async_wrapper if is_async else _do_wrapper, query=query, body=body, path=path,
+                                 form=form, header=header, cookie=cookie, responses=responses,
+                                 cache=response_cache, limits=limits, trusted=trusted or None)
 
-            @wraps(func)
-            def wrap(**kwargs):
-                return _do_wrapper(func, query=query, body=body, path=path, form=form, **kwargs)
+            def call(args, kwargs):
+                # read on each request, they may be changed on the instance after decoration
+                rate = self.validate_response_rate if validate_response is None else float(validate_response)
+                view = partial(func, *args) if args else func  # `self` of a MethodView method
+                return do_wrapper(view, validate_rate=rate, json_provider=self.json_provider, metrics=self.metrics,
+                                  **kwargs)
 
+            if is_async:
+                @wraps(func)
+                async def wrap(*args, **kwargs):
+                    return await call(args, kwargs)
+            else:
+                @wraps(func)
+                def wrap(*args, **kwargs):
+                    return call(args, kwargs)
+
+            wrap.query_cache = models_cache
+            wrap.cache = response_cache
+            if self.lazy and not self.api_doc_file:
+                with self._lock:
+                    self._pending_operations.append(
+                        (func, wrap, tags, responses, security, response_cache, limits))
             return wrap
         return decorate
 
+    def _security_schemes(self, security):
+        """Schemes of the security requirements of a view, None for a name without scheme."""
+        requirements = security or self.securitySchemes
+        if isinstance(requirements, dict):
+            requirements = [requirements]
+        known = self.securitySchemes or {}
+        return [
+            value if isinstance(value, (BaseModel, dict)) else known.get(name)
+            for requirement in requirements or () for name, value in requirement.items()
+        ]
+
+    def _build_operation(self, func, tags, responses, security, cache=None, limits=None):
+        operation = get_operation(func)
+        if security or self.securitySchemes:
+            operation.security = security if security else [self.securitySchemes]
+        parse_func_info(func, self.components_schemas, operation)
+        add_swagger_info(self.components_schemas, responses, tags, operation)
+        if cache is not None:
+            add_cache_info(cache, operation)
+        if limits is not None:
+            add_limits_info(limits, operation)
+        self.invalidate_api_doc()
+
+    def _build_pending(self):
+        """Build the operations deferred by `lazy` mode and bind them to the url rules."""
+        with self._lock:
+            while self._pending_operations:
+                func, wrap, tags, responses, security, cache, limits = self._pending_operations[0]
+                self._build_operation(func, tags, responses, security, cache, limits)
+                wrap.operation = func.operation
+                # removed only once built, a failed build is retried on the next access
+                self._pending_operations.pop(0)
+            if self.app is not None:
+                self._bind_rules()
+
     def register_swagger(self):
-        """注册 swagger 路径与函数信息绑定"""
-        bind_rule_swagger(self.app.url_map, self.app.view_functions, self.paths)
+        """注册 swagger 路径与函数信息绑定
+
+        Rules are bound as they are added, this only binds rules whose view-func was
+        registered outside of `add_url_rule`, kept for compatibility.
+        """
+        if self.api_doc_file:
+            return
+        if not self.lazy:
+            self._bind_rules()
+        self.invalidate_api_doc()
 
 
 opp = OpenApi()
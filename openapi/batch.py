@@ -0,0 +1,132 @@
+"""Many documented operations in one request, ``POST /<api_name>/batch``"""
+import sys
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Union
+from flask import Flask, Response, request, current_app
+from pydantic import BaseModel
+from werkzeug.datastructures import Headers
+from werkzeug.exceptions import HTTPException, NotFound, BadRequest
+from werkzeug.test import EnvironBuilder
+from .compat import validate_as, validation_error
+from .limits import ITEMS_LIMIT
+
+# headers of the batch request not passed on to its sub-requests
+_SKIP_HEADERS = frozenset(('content-type', 'content-length', 'transfer-encoding'))
+
+
+class SubRequest(BaseModel):
+    method: str = 'GET'
+    path: str
+    query: Union[Dict[str, Any], str] = None
+    body: Any = None
+    headers: Dict[str, str] = None
+
+
+def is_documented(view_func, method: str) -> bool:
+    """Whether view-func, or its `MethodView` method handling method, is decorated with `OpenApi.swagger`."""
+    if getattr(view_func, '_swagger', False):
+        return True
+    view_class = getattr(view_func, 'view_class', None)
+    if view_class is None:
+        return False
+    handler = getattr(view_class, method.lower(), None)
+    if handler is None and method == 'HEAD':
+        handler = getattr(view_class, 'get', None)
+    return getattr(handler, '_swagger', False)
+
+
+class Batch:
+    """Dispatch a json array of ``{method, path, query, body, headers}`` sub-requests.
+
+    Each sub-request runs in its own app and request context, so it is bound and
+    validated by its view-func exactly like a single request, before/after request
+    hooks, teardowns and error handlers included, and has its own `flask.g`. Headers of the batch request (cookies,
+    authorization...) are passed on, ``headers`` of a sub-request override them.
+    Only documented endpoints (methods of a `MethodView`) are dispatched, the others
+    answer 404, a sub-request that cannot be built answers 400.
+
+    The response is an array of ``{status, headers, body}`` in the order of the
+    sub-requests, json bodies are embedded as they were serialized by the view.
+
+    :param max_requests: sub-requests accepted in one batch
+    :param max_workers: threads running the sub-requests concurrently, None runs them
+                        one after the other, set it only when they are independent
+    """
+
+    def __init__(self, max_requests: int = 20, max_workers: int = None):
+        self.max_requests = max_requests
+        self.max_workers = max_workers
+        self._executor = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='openapi-batch')
+        return self._executor
+
+    def parse(self, data: Any) -> List[SubRequest]:
+        """Sub-requests of the batch request, raise `ValidationError`."""
+        subs = validate_as(List[SubRequest], data)
+        if len(subs) > self.max_requests:
+            raise validation_error(SubRequest, ('__root__',), *ITEMS_LIMIT, limit_value=self.max_requests)
+        return subs
+
+    def _environ(self, sub: SubRequest, headers: Headers, base_url: str, remote_addr: str) -> dict:
+        if sub.headers:
+            headers = headers.copy()
+            headers.update(sub.headers)
+        builder = EnvironBuilder(
+            path=sub.path,
+            base_url=base_url,
+            method=sub.method.upper(),
+            query_string=sub.query,
+            headers=headers,
+            json=sub.body,
+            environ_base={'REMOTE_ADDR': remote_addr}
+        )
+        try:
+            return builder.get_environ()
+        finally:
+            builder.close()
+
+    def dispatch(self, app: Flask, sub: SubRequest, headers: Headers, base_url: str, remote_addr: str) -> Response:
+        """Run one sub-request, in its own app context so `flask.g` and the teardowns are its own."""
+        try:
+            environ = self._environ(sub, headers, base_url, remote_addr)
+        except (TypeError, ValueError) as e:  # e.g. a query both in path and in query
+            return BadRequest(f"Invalid sub-request: {e}").get_response()
+        with app.app_context(), app.request_context(environ):
+            try:
+                if request.routing_exception is not None:
+                    raise request.routing_exception
+                if not is_documented(app.view_functions[request.url_rule.endpoint], request.method):
+                    raise NotFound()
+                resp = app.full_dispatch_request()
+            except HTTPException as e:
+                resp = e.get_response()
+            except Exception:  # noqa
+                app.log_exception(sys.exc_info())
+                resp = Response(status=500)
+            # read the body while the context of a streamed response is still alive
+            resp.get_data()
+            return resp
+
+    def run(self, subs: List[SubRequest], json_provider) -> Response:
+        app = current_app._get_current_object()
+        headers = Headers([(k, v) for k, v in request.headers.items() if k.lower() not in _SKIP_HEADERS])
+        dispatch = partial(self.dispatch, app, headers=headers, base_url=request.host_url,
+                           remote_addr=request.remote_addr)
+        if self.max_workers and len(subs) > 1:
+            responses = list(self.executor.map(dispatch, subs))
+        else:
+            responses = [dispatch(sub) for sub in subs]
+
+        parts = []
+        for resp in responses:
+            result_headers = {k: v for k, v in resp.headers.items() if k.lower() != 'content-length'}
+            data = resp.get_data()
+            body = data if resp.is_json and data else json_provider.dumps(data.decode('utf-8', 'replace') or None)
+            parts.append(b'{"status":%d,"headers":%s,"body":%s}' % (
+                resp.status_code, json_provider.dumps(result_headers), body))
+        return Response(b'[' + b','.join(parts) + b']', mimetype='application/json')
@@ -0,0 +1,125 @@
+"""Precompiled request binders"""
+from typing import Type, Tuple, Hashable, List
+from pydantic import BaseModel, ValidationError
+from werkzeug.datastructures import MultiDict
+from .validator import FileStorage, make_stream_factory
+from .cache import LRUCache
+from .compat import model_fields, model_schema, inner_type, copy, errors
+
+_EMPTY = MultiDict()
+_MUTABLE = (list, set, dict)
+
+
+class CachedValidationError(Exception):
+    """Raised by `Binder.cached` for a source that failed validation before, with its `compat.errors`."""
+
+    def __init__(self, errors: List[dict]):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _is_array(value: dict) -> bool:
+    return value.get('type') == 'array'
+
+
+def _is_file(value: dict) -> bool:
+    if _is_array(value):
+        value = value.get('items') or {}
+    return value.get('type') == 'string' and value.get('format') == 'binary'
+
+
+class Binder:
+    """Bind a ``MultiDict`` source (query string, form) to a pydantic model.
+
+    The model schema is walked once when the binder is built; binding a request
+    is a loop over the precomputed ``(key, is_array)`` tuples. Keys are the
+    schema property names, i.e. field aliases, which is what the model accepts.
+    """
+    __slots__ = ('model', 'fields', 'file_fields', 'stream_factory', 'cache')
+
+    def __init__(self, model: Type[BaseModel], cache: LRUCache = None):
+        self.model = model
+        # validated models (or the errors of the invalid ones) by raw source, see `cached`
+        self.cache = cache
+        properties = model_schema(model).get('properties', {})
+        self.fields: Tuple[Tuple[str, bool], ...] = tuple(
+            (key, _is_array(value)) for key, value in properties.items() if not _is_file(value))
+        self.file_fields: Tuple[Tuple[str, bool], ...] = tuple(
+            (key, _is_array(value)) for key, value in properties.items() if _is_file(value))
+        # upload limits of `validator.confile` fields, applied while the multipart body is parsed
+        self.stream_factory = make_stream_factory(
+            type_ for type_ in (inner_type(field.annotation) for field in model_fields(model))
+            if isinstance(type_, type) and issubclass(type_, FileStorage))
+
+    def bind(self, source: MultiDict, files: MultiDict = None) -> dict:
+        data = {}
+        for key, is_array in self.fields:
+            if key in source:
+                data[key] = source.getlist(key) if is_array else source.get(key)
+        if files:
+            for key, is_array in self.file_fields:
+                if key in files:
+                    data[key] = files.getlist(key) if is_array else files.get(key)
+        return data
+
+    def __call__(self, source: MultiDict = None, files: MultiDict = None) -> BaseModel:
+        return self.model(**self.bind(source or _EMPTY, files))
+
+    def cached(self, key: Hashable, source: MultiDict) -> BaseModel:
+        """Bind source, reusing the model or the errors of a previous identical key.
+
+        Each request gets its own copy of the cached model, its list, set and dict
+        values copied too, the values bound from a query string or form. An invalid
+        source raises its `ValidationError` the first time, then a new
+        `CachedValidationError` holding only the serialized errors, the exception
+        and its traceback are not kept.
+        """
+        if self.cache is None:
+            return self(source)
+        result = self.cache.get(key)
+        if result is None:
+            try:
+                result = self(source)
+            except ValidationError as e:
+                self.cache.set(key, errors(e))
+                raise
+            self.cache.set(key, result)
+        if isinstance(result, list):
+            raise CachedValidationError(result)
+        return copy(result, {k: v.copy() for k, v in result.__dict__.items() if isinstance(v, _MUTABLE)} or None)
+
+
+def header_name(key: str) -> str:
+    """Header documented and read for a header model field, ``x_tenant_id`` -> ``x-tenant-id``."""
+    return key.replace('_', '-')
+
+
+def _environ_key(key: str) -> str:
+    key = header_name(key).upper().replace('-', '_')
+    return key if key in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{key}'
+
+
+class HeaderBinder:
+    """Bind request headers to a pydantic model.
+
+    Header names are normalized once into WSGI environ keys, so reading a field
+    is a single dict lookup. Array fields read comma separated values.
+    """
+    __slots__ = ('model', 'fields')
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        properties = model_schema(model).get('properties', {})
+        self.fields: Tuple[Tuple[str, str, bool], ...] = tuple(
+            (key, _environ_key(key), _is_array(value)) for key, value in properties.items())
+
+    def bind(self, environ: dict) -> dict:
+        data = {}
+        for key, environ_key, is_array in self.fields:
+            value = environ.get(environ_key)
+            if value is not None:
+                data[key] = [v.strip() for v in value.split(',')] if is_array else value
+        return data
+
+    def __call__(self, environ: dict) -> BaseModel:
+        return self.model(**self.bind(environ))
@@ -0,0 +1,238 @@
+"""Caches for validated models and whole view responses"""
+import time
+import pickle
+import sqlite3
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional, Tuple
+from flask import Response, request, make_response
+from .compat import dump_json_sorted
+
+
+class LRUCache:
+    """Bounded, thread-safe LRU cache with an optional TTL in seconds, counting hits and misses."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires = item
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: float = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = value, expires
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def info(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "maxsize": self.maxsize,
+            "currsize": len(self._data),
+            "ttl": self.ttl
+        }
+
+
+class SQLiteCache:
+    """`LRUCache` compatible backend in a sqlite file, shared by the worker processes of one host.
+
+    Values are pickled, expired rows are dropped when they are read.
+    """
+
+    def __init__(self, filename: str, ttl: float = None):
+        self.filename = filename
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filename, check_same_thread=False, isolation_level=None)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires FROM cache WHERE key = ?", (str(key),)).fetchone()
+            if row is not None:
+                value, expires = row
+                if expires is None or expires > time.time():
+                    self.hits += 1
+                    return pickle.loads(value)
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (str(key),))
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: float = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                (str(key), pickle.dumps(value), expires)
+            )
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (str(key),))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def info(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "filename": self.filename,
+            "currsize": len(self),
+            "ttl": self.ttl
+        }
+
+
+def _credential(scheme: Any) -> Tuple[str, str]:
+    """(in, name) of the credential a security scheme reads, ``Authorization`` for http, oauth2..."""
+    if scheme is not None and not isinstance(scheme, dict):
+        scheme = {'type': getattr(scheme, 'type_', None), 'in': getattr(scheme, 'in_', None),
+                  'name': getattr(scheme, 'name', None)}
+    if scheme and getattr(scheme.get('type'), 'value', scheme.get('type')) == 'apiKey' and scheme.get('name'):
+        return str(getattr(scheme['in'], 'value', scheme['in'])), scheme['name']
+    return 'header', 'Authorization'
+
+
+class ResponseCache:
+    """Cache policy of a view, ``swagger(cache=ResponseCache(...))``.
+
+    Responses are keyed by the endpoint, the method, every validated model of the
+    request (path, query, header, body, form, cookie) and the request headers named
+    in vary. Responses keyed by a cookie model are sent ``private`` with
+    ``Vary: Cookie``. On a view with security schemes the credentials (api key,
+    ``Authorization`` header) are part of the key too, see `secured`. Only 200
+    responses without cookies that are not streamed are stored, as
+    ``(body, status, headers)`` so any backend with ``get``/``set`` (`LRUCache`,
+    `SQLiteCache`, ...) can hold them.
+
+    :param ttl: seconds a response is reused, also its ``Cache-Control: max-age``
+    :param vary: request header names that select different responses
+    :param backend: storage, defaults to an `LRUCache` of maxsize entries
+    :param private: ``Cache-Control: private`` instead of public
+    """
+    key_models = ('path', 'query', 'header', 'body', 'form', 'cookie')
+
+    def __init__(self, ttl: float = 60, vary: Iterable[str] = (), backend: Any = None, maxsize: int = 1024,
+                 private: bool = False):
+        self.ttl = ttl
+        self.vary = tuple(vary)
+        self.backend = backend if backend is not None else LRUCache(maxsize, ttl)
+        self.private = private
+        self.credentials: Tuple[Tuple[str, str], ...] = ()  # (in, name) of the credentials, see `secured`
+
+    def secured(self, schemes: Iterable[Any]) -> 'ResponseCache':
+        """Copy keyed on the credentials of the security schemes, sent private with their headers in Vary.
+
+        The backend is shared with this cache.
+
+        :param schemes: `models.security` schemes or their dicts, None for an unknown scheme
+        """
+        cache = copy.copy(self)
+        cache.credentials = tuple(dict.fromkeys(_credential(scheme) for scheme in schemes))
+        return cache
+
+    @property
+    def credential_headers(self) -> Tuple[str, ...]:
+        """Request headers holding the credentials, added to Vary"""
+        return tuple(dict.fromkeys(
+            'Cookie' if in_ == 'cookie' else name for in_, name in self.credentials if in_ != 'query'))
+
+    @property
+    def cache_control(self) -> str:
+        private = self.private or bool(self.credentials)
+        return f"{'private' if private else 'public'}, max-age={int(self.ttl)}"
+
+    def key(self, kwargs: dict) -> str:
+        """Key of the current request, from the validated view-func kwargs."""
+        parts = [request.endpoint or '', request.method]
+        for name in self.key_models:
+            model = kwargs.get(name)
+            parts.append(dump_json_sorted(model) if model is not None else '')
+        parts.extend(request.headers.get(name, '') for name in self.vary)
+        for in_, name in self.credentials:
+            source = request.headers if in_ == 'header' else request.cookies if in_ == 'cookie' else request.args
+            parts.append(source.get(name, ''))
+        return hashlib.sha256('\x00'.join(parts).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Response]:
+        item = self.backend.get(key)
+        if item is None:
+            return None
+        body, status, headers = item
+        return self._headers(Response(body, status=status, headers=headers))
+
+    def set(self, key: str, resp: Any, kwargs: dict = None) -> Response:
+        """Store the view-func result when it is cacheable, return it as a `flask.Response`.
+
+        :param kwargs: the validated view-func kwargs the key was built from
+        """
+        resp = make_response(resp)
+        if resp.status_code == 200 and not resp.is_streamed and 'Set-Cookie' not in resp.headers:
+            if kwargs and kwargs.get('cookie') is not None:
+                resp.vary.add('Cookie')
+            headers = [(k, v) for k, v in resp.headers.items() if k != 'Content-Length']
+            self.backend.set(key, (resp.get_data(), resp.status_code, headers), self.ttl)
+            self._headers(resp)
+        return resp
+
+    def _headers(self, resp: Response) -> Response:
+        if 'Cookie' in resp.vary:
+            # per user, kept out of shared caches
+            resp.headers['Cache-Control'] = f"private, max-age={int(self.ttl)}"
+        else:
+            resp.headers['Cache-Control'] = self.cache_control
+        for name in self.vary + self.credential_headers:
+            resp.vary.add(name)
+        return resp
+
+    def spec(self) -> dict:
+        """``x-cache`` extension of the documented operation"""
+        return {
+            "ttl": self.ttl,
+            "key": list(self.key_models),
+            "vary": list(self.vary + self.credential_headers),
+            "private": self.private or bool(self.credentials),
+            "backend": type(self.backend).__name__
+        }
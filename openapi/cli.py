@@ -0,0 +1,62 @@
+"""flask openapi ... commands"""
+import os
+import json
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+openapi_cli = AppGroup('openapi', help='OpenAPI document commands.')
+
+
+def _get_openapi(api_name):
+    apis = current_app.extensions.get('openapi', {})
+    if api_name is None and len(apis) == 1:
+        return next(iter(apis.values()))
+    if api_name not in apis:
+        raise click.UsageError(f"Unknown api name {api_name!r}, choose from: {', '.join(apis)}")
+    return apis[api_name]
+
+
+@openapi_cli.command('export')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='Output file, stdout if omitted.')
+@click.option('--format', '-f', 'format_', type=click.Choice(['json', 'yaml']),
+              help='Output format, guessed from the output file extension by default.')
+@click.option('--api-name', help='`OpenApi.api_name` to export when the app has several.')
+def export(output, format_, api_name):
+    """Write the OpenAPI document to a file, and the document of each blueprint next to it."""
+    openapi = _get_openapi(api_name)
+    if openapi.api_doc_file:
+        raise click.UsageError('`api_doc_file` is set, the document is not generated from the views.')
+    if format_ is None:
+        format_ = 'yaml' if output and os.path.splitext(output)[1] in ('.yaml', '.yml') else 'json'
+
+    openapi.register_swagger()
+    if format_ == 'yaml':
+        try:
+            import yaml
+        except ImportError:
+            raise click.UsageError('YAML export requires PyYAML.')
+
+        def dumps(doc):
+            return yaml.safe_dump(doc, allow_unicode=True, sort_keys=False).encode('utf-8')
+    else:
+        def dumps(doc):
+            return json.dumps(doc, ensure_ascii=False, indent=2).encode('utf-8')
+
+    if output is None:
+        click.echo(dumps(openapi.api_doc).decode('utf-8'))
+        return
+    # the blueprint files are found next to output when it is served as `api_doc_file`
+    for name, path, asset in openapi.doc_files(output):
+        with open(path, 'wb') as f:
+            f.write(dumps(json.loads(bytes(asset.data))))
+    click.echo(f'OpenAPI document written to {output}')
+
+
+@openapi_cli.command('precompress')
+def precompress():
+    """Write .gz/.br siblings of the bundled Swagger/ReDoc assets."""
+    from .compress import precompress_static
+    static_folder = os.path.join(os.path.dirname(__file__), 'templates', 'static')
+    precompress_static(static_folder)
+    click.echo(f'Static assets precompressed in {static_folder}')
@@ -0,0 +1,217 @@
+"""Pydantic v1 and v2 behind one interface.
+
+Everything else imports pydantic specifics from here: schemas are returned in the
+v1 shape (``definitions``, Optional unwrapped), fields as `ModelField` tuples, and
+validation errors are built and serialized the same way on both versions.
+"""
+import json
+import typing
+from typing import Any, Dict, Iterable, NamedTuple, Tuple, Type
+from pydantic import VERSION, BaseModel, ValidationError
+
+PYDANTIC_V2 = int(VERSION.split('.')[0]) >= 2
+
+if PYDANTIC_V2:
+    from pydantic import RootModel, TypeAdapter
+    from pydantic_core import PydanticCustomError, to_jsonable_python as json_encoder
+else:
+    from pydantic import parse_obj_as
+    from pydantic.error_wrappers import ErrorWrapper
+    from pydantic.errors import PydanticValueError
+    from pydantic.json import pydantic_encoder as json_encoder
+
+_NONE_TYPE = type(None)
+_LIST_ORIGINS = (list, tuple, set, frozenset, typing.List, typing.Tuple, typing.Set, typing.Sequence,
+                 typing.AbstractSet)
+
+
+class ModelField(NamedTuple):
+    name: str
+    alias: str
+    annotation: Any  # Optional[X] is X
+
+
+def _strip_optional(annotation: Any) -> Any:
+    if getattr(annotation, '__origin__', None) is typing.Union:
+        args = [a for a in annotation.__args__ if a is not _NONE_TYPE]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+_fields = {}
+
+
+def model_fields(model: Type[BaseModel]) -> Tuple[ModelField, ...]:
+    fields = _fields.get(model)
+    if fields is None:
+        if PYDANTIC_V2:
+            fields = tuple(ModelField(name, field.alias or name, _strip_optional(field.annotation))
+                           for name, field in model.model_fields.items())
+        else:
+            fields = tuple(ModelField(name, field.alias, field.outer_type_)
+                           for name, field in model.__fields__.items())
+        _fields[model] = fields
+    return fields
+
+
+def inner_type(annotation: Any) -> Any:
+    """``List[X]`` is X, the type of a single value of a field."""
+    annotation = _strip_optional(annotation)
+    origin = getattr(annotation, '__origin__', None)
+    if origin in _LIST_ORIGINS or (isinstance(origin, type) and issubclass(origin, (list, tuple, set, frozenset))):
+        args = [a for a in getattr(annotation, '__args__', ()) if a is not Ellipsis]
+        return _strip_optional(args[0]) if args else Any
+    return annotation
+
+
+# keys holding {name: schema}, the values of the other keys are schemas, lists of schemas or data
+_SCHEMA_MAPS = frozenset(('properties', 'patternProperties', '$defs', 'definitions'))
+_SCHEMA_KEYS = frozenset(('items', 'additionalProperties', 'not', 'anyOf', 'allOf', 'oneOf', 'prefixItems'))
+
+
+def _v1_schema(value: dict) -> dict:
+    """`model_json_schema` output in the shape of v1 `schema`: ``$defs`` are ``definitions``,
+    ``anyOf: [X, null]`` of Optional fields is X, a ``$ref`` with siblings is wrapped
+    in ``allOf``, ``default: null`` and ``additionalProperties: true`` are left out.
+    """
+    any_of = value.get('anyOf')
+    if any_of and len(any_of) == 2 and {'type': 'null'} in any_of:
+        other = any_of[0] if any_of[1] == {'type': 'null'} else any_of[1]
+        value = dict(other, **{k: v for k, v in value.items() if k != 'anyOf'})
+    if 'default' in value and value['default'] is None:
+        value = {k: v for k, v in value.items() if k != 'default'}
+    if '$ref' in value and len(value) > 1:
+        # openapi 3.0 ignores the siblings of a $ref
+        value = dict({'allOf': [{'$ref': value['$ref']}]}, **{k: v for k, v in value.items() if k != '$ref'})
+    schema = {}
+    for k, v in value.items():
+        if k in _SCHEMA_MAPS:
+            v = {name: _v1_schema(s) for name, s in v.items()}
+        elif k in _SCHEMA_KEYS:
+            if v is True and k == 'additionalProperties':
+                continue
+            if isinstance(v, list):
+                v = [_v1_schema(s) for s in v]
+            elif isinstance(v, dict):
+                v = _v1_schema(v)
+        schema['definitions' if k == '$defs' else k] = v
+    return schema
+
+
+def model_schema(model: Type[BaseModel], ref_template: str = None) -> dict:
+    """``model.schema()``, refs default to the definitions of the schema itself"""
+    if PYDANTIC_V2:
+        kwargs = {'ref_template': ref_template} if ref_template else {}
+        schema = _v1_schema(model.model_json_schema(**kwargs))
+        for definition in schema.get('definitions', {}).values():
+            # v1 describes the enums without docstring as well
+            if 'enum' in definition:
+                definition.setdefault('description', 'An enumeration.')
+        return schema
+    return model.schema(ref_template=ref_template) if ref_template else model.schema()
+
+
+def is_root_model(model: Type[BaseModel]) -> bool:
+    """``__root__`` models on v1, `RootModel` on v2"""
+    if PYDANTIC_V2:
+        return issubclass(model, RootModel)
+    return bool(model.__custom_root_type__)
+
+
+def validate(model: Type[BaseModel], obj: Any) -> BaseModel:
+    if PYDANTIC_V2:
+        return model.model_validate(obj)
+    return model.parse_obj(obj)
+
+
+_adapters = {}
+
+
+def validate_as(type_: Any, obj: Any) -> Any:
+    """Validate obj as any type, ``List[Model]``..."""
+    if PYDANTIC_V2:
+        adapter = _adapters.get(type_)
+        if adapter is None:
+            adapter = _adapters[type_] = TypeAdapter(type_)
+        return adapter.validate_python(obj)
+    return parse_obj_as(type_, obj)
+
+
+def construct(model: Type[BaseModel], fields_set: set, values: dict) -> BaseModel:
+    """Model from field names and values, nothing is validated"""
+    if PYDANTIC_V2:
+        if issubclass(model, RootModel):
+            return model.model_construct(values.get('root'), fields_set)
+        return model.model_construct(fields_set, **values)
+    return model.construct(fields_set, **values)
+
+
+def copy(model: BaseModel, update: dict = None) -> BaseModel:
+    """``model.copy(update=update)``, shallow"""
+    if PYDANTIC_V2:
+        return model.model_copy(update=update)
+    return model.copy(update=update)
+
+
+def dump(model: BaseModel, **kwargs) -> dict:
+    """``model.dict(**kwargs)``"""
+    if PYDANTIC_V2:
+        return model.model_dump(**kwargs)
+    return model.dict(**kwargs)
+
+
+def dump_json_sorted(model: BaseModel) -> str:
+    """Json of the model with sorted keys, equal models give equal strings"""
+    if PYDANTIC_V2:
+        return json.dumps(model.model_dump(mode='json'), sort_keys=True)
+    return model.json(sort_keys=True)
+
+
+_error_types = {}
+
+
+def validation_error(model: Type[BaseModel], loc: tuple, code: str, msg_template: str,
+                     cls: Type[ValidationError] = ValidationError, **ctx) -> ValidationError:
+    """A validation error of type ``value_error.<code>`` raised outside of pydantic.
+
+    :param msg_template: message formatted with ctx, ``'more than {limit_value}'``
+    """
+    if PYDANTIC_V2:
+        error = PydanticCustomError(f'value_error.{code}', msg_template, ctx or None)
+        return cls.from_exception_data(model.__name__, [{'type': error, 'loc': loc, 'input': None}])
+    error_type = _error_types.get((code, msg_template))
+    if error_type is None:
+        error_type = _error_types[code, msg_template] = type(
+            'CustomValueError', (PydanticValueError,), {'code': code, 'msg_template': msg_template})
+    return cls([ErrorWrapper(error_type(**ctx), loc=loc)], model)
+
+
+def prefix_errors(e: ValidationError, loc: tuple, model: Type[BaseModel],
+                  cls: Type[ValidationError] = ValidationError) -> ValidationError:
+    """The errors of e with loc prepended to their location"""
+    if PYDANTIC_V2:
+        return cls.from_exception_data(model.__name__, [
+            {'type': PydanticCustomError(error['type'], error['msg'], _json_ctx(error.get('ctx'))),
+             'loc': loc + tuple(error['loc']), 'input': error.get('input')}
+            for error in e.errors(include_url=False)
+        ])
+    return cls([ErrorWrapper(e, loc=loc)], model)
+
+
+def _json_ctx(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    if not ctx:
+        return None
+    return {k: str(v) if isinstance(v, Exception) else v for k, v in ctx.items()}
+
+
+def errors(e: ValidationError) -> Iterable[dict]:
+    """``e.errors()`` safe to serialize, v2 errors drop the input and url, exceptions of ctx are strings."""
+    if not PYDANTIC_V2:
+        return e.errors()
+    result = []
+    for error in e.errors(include_url=False, include_input=False):
+        if 'ctx' in error:
+            error['ctx'] = _json_ctx(error['ctx'])
+        result.append(error)
+    return result
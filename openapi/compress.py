@@ -0,0 +1,130 @@
+"""Precompressed gzip/brotli responses for the spec and the bundled static assets"""
+import os
+import gzip
+import mmap
+import hashlib
+import mimetypes
+from typing import Dict, Iterator, Union
+from flask import Response, request, make_response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+STATIC_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+CHUNK_SIZE = 64 * 1024
+
+
+def compress(data: bytes, level: int = 9) -> Dict[str, bytes]:
+    """Return the encoded variants of data, keyed by content-coding."""
+    variants = {}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=min(level, 11))
+    variants['gzip'] = gzip.compress(data, compresslevel=level, mtime=0)
+    return variants
+
+
+def map_file(filename: str) -> mmap.mmap:
+    """Read-only memory map of a file, its pages are shared by every process mapping it."""
+    with open(filename, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _iter_chunks(data: mmap.mmap) -> Iterator[bytes]:
+    for start in range(0, len(data), CHUNK_SIZE):
+        yield data[start:start + CHUNK_SIZE]
+
+
+def _make_body_response(body: Union[bytes, mmap.mmap]) -> Response:
+    if isinstance(body, mmap.mmap):
+        # streamed in chunks, never copied into the heap as a whole
+        resp = Response(_iter_chunks(body))
+        resp.content_length = len(body)
+        return resp
+    return make_response(body)
+
+
+class CompressedAsset:
+    """Response body held in identity and encoded forms, negotiated by Accept-Encoding.
+
+    Bodies are bytes, or read-only memory maps for documents shared between worker processes.
+    """
+    __slots__ = ('data', 'etag', 'mimetype', 'variants')
+
+    def __init__(self, data: bytes, mimetype: str, etag: str = None, variants: Dict[str, bytes] = None):
+        self.data = data
+        self.etag = etag or hashlib.sha256(data).hexdigest()
+        self.mimetype = mimetype
+        self.variants = variants or {}
+
+    @classmethod
+    def from_file(cls, filename: str, precompress: bool = True) -> 'CompressedAsset':
+        """Load a static file, preferring ``.br``/``.gz`` siblings produced at build time."""
+        with open(filename, 'rb') as f:
+            data = f.read()
+        variants = {}
+        if precompress:
+            for encoding, suffix in SUFFIXES.items():
+                if os.path.exists(filename + suffix):
+                    with open(filename + suffix, 'rb') as f:
+                        variants[encoding] = f.read()
+            if not variants:
+                variants = compress(data)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        return cls(data, mimetype, variants=variants)
+
+    @classmethod
+    def from_mmap(cls, filename: str, mimetype: str, precompress: bool = False) -> 'CompressedAsset':
+        """Map a file read-only, with its ``.br``/``.gz`` siblings, instead of reading it into memory."""
+        data = map_file(filename)
+        variants = {}
+        if precompress:
+            for encoding, suffix in SUFFIXES.items():
+                if os.path.exists(filename + suffix):
+                    variants[encoding] = map_file(filename + suffix)
+            if not variants:
+                variants = compress(data[:])
+        return cls(data, mimetype, variants=variants)
+
+    def make_response(self, cache_control: str):
+        encoding = request.accept_encodings.best_match(list(self.variants), default='identity')
+        if encoding in self.variants:
+            resp = _make_body_response(self.variants[encoding])
+            resp.headers['Content-Encoding'] = encoding
+            resp.set_etag(f'{self.etag}-{encoding}')
+        else:
+            resp = _make_body_response(self.data)
+            resp.set_etag(self.etag)
+        resp.mimetype = self.mimetype
+        resp.vary.add('Accept-Encoding')
+        resp.headers['Cache-Control'] = cache_control
+        return resp.make_conditional(request)
+
+
+def load_static_assets(static_folder: str, precompress: bool = True) -> Dict[str, CompressedAsset]:
+    """Load every file of static_folder, keyed by its url path relative to the folder."""
+    assets = {}
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if os.path.splitext(name)[1] in SUFFIXES.values():
+                continue
+            filename = os.path.join(root, name)
+            key = os.path.relpath(filename, static_folder).replace(os.sep, '/')
+            assets[key] = CompressedAsset.from_file(filename, precompress)
+    return assets
+
+
+def precompress_static(static_folder: str, level: int = 9) -> None:
+    """Write ``.gz``/``.br`` siblings of the static files, run once at build time."""
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if os.path.splitext(name)[1] in SUFFIXES.values():
+                continue
+            filename = os.path.join(root, name)
+            with open(filename, 'rb') as f:
+                variants = compress(f.read(), level)
+            for encoding, data in variants.items():
+                with open(filename + SUFFIXES[encoding], 'wb') as f:
+                    f.write(data)
@@ -0,0 +1,75 @@
+"""Pluggable json encoder/decoder, used for request bodies, 422 errors, responses and the spec"""
+import json
+import logging
+from typing import Any, Union
+from .compat import json_encoder
+
+logger = logging.getLogger(__name__)
+
+
+class JSONProvider:
+    """Standard library json"""
+    name = 'json'
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, default=json_encoder).encode('utf-8')
+
+
+class OrjsonProvider(JSONProvider):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self._option = orjson.OPT_NON_STR_KEYS
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return self._orjson.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._orjson.dumps(obj, default=json_encoder, option=self._option)
+
+
+class UjsonProvider(JSONProvider):
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return self._ujson.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._ujson.dumps(obj, default=json_encoder).encode('utf-8')
+
+
+PROVIDERS = {
+    'json': JSONProvider,
+    'orjson': OrjsonProvider,
+    'ujson': UjsonProvider,
+}
+
+
+def get_json_provider(provider: Union[str, JSONProvider, None] = None) -> JSONProvider:
+    """Return a provider instance.
+
+    :param provider: None, a provider instance, 'json', 'orjson', 'ujson', or 'auto'
+        for the fastest installed one. A missing library falls back to the standard library.
+    """
+    if provider is None:
+        return JSONProvider()
+    if not isinstance(provider, str):
+        return provider
+    names = ('orjson', 'ujson', 'json') if provider == 'auto' else (provider,)
+    for name in names:
+        assert name in PROVIDERS, f"Unknown json provider `{name}`, choose from: {', '.join(PROVIDERS)}"
+        try:
+            return PROVIDERS[name]()
+        except ImportError:
+            if provider != 'auto':
+                logger.warning("json provider `%s` is not installed, falling back to json", name)
+    return JSONProvider()
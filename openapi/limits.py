@@ -0,0 +1,124 @@
+"""Request size and shape limits, checked on the raw input before pydantic validation"""
+from typing import IO, Any, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import RequestEntityTooLarge
+from .compat import validation_error
+
+# (code, message) of the ``value_error.<code>`` validation errors
+DEPTH_LIMIT = ('limit.depth', 'nested deeper than {limit_value} levels')
+ITEMS_LIMIT = ('limit.items', 'array has more than {limit_value} items')
+ITEM_SIZE_LIMIT = ('limit.item_size', 'item is larger than {limit_value} characters')
+QUERY_PARAMS_LIMIT = ('limit.query_params', 'more than {limit_value} query parameters')
+QUERY_REPEATS_LIMIT = ('limit.query_repeats', 'query parameter repeated more than {limit_value} times')
+
+
+def _error(limit: Tuple[str, str], value: int, loc: str, model: Type[BaseModel]) -> ValidationError:
+    return validation_error(model, (loc,), *limit, limit_value=value)
+
+
+class _LimitedStream:
+    """Reads one byte over max_body_size at most, to raise `RequestEntityTooLarge` on it."""
+
+    def __init__(self, stream: IO[bytes], limits: 'RequestLimits'):
+        self.stream = stream
+        self.limits = limits
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        remaining = self.limits.max_body_size + 1 - self.size
+        data = self.stream.read(remaining if size is None or size < 0 else min(size, remaining))
+        self.size += len(data)
+        self.limits.check_content_length(self.size)
+        return data
+
+
+class RequestLimits:
+    """Limits of a view, ``swagger(limits=RequestLimits(...))``.
+
+    A body larger than max_body_size is rejected with 413 from its Content-Length,
+    before it is read, a body without Content-Length is read up to one byte over the
+    limit. The other limits fail like validation, with 422: parsed json bodies are
+    walked for depth and array length before pydantic validates them, the query
+    string is counted before it is bound, with or without a query model. `Stream`
+    bodies stop at max_items, at an item over max_item_size and with 413 past
+    max_body_size.
+
+    :param max_body_size: bytes
+    :param max_items: length of any json array of the body
+    :param max_depth: nesting of json objects and arrays, the top level is 1
+    :param max_query_params: ``key=value`` pairs in the query string
+    :param max_query_repeats: values of a single query parameter
+    :param max_item_size: characters of one item of a `Stream` body
+    """
+
+    def __init__(self, max_body_size: int = None, max_items: int = None, max_depth: int = None,
+                 max_query_params: int = None, max_query_repeats: int = None, max_item_size: int = None):
+        self.max_body_size = max_body_size
+        self.max_items = max_items
+        self.max_depth = max_depth
+        self.max_query_params = max_query_params
+        self.max_query_repeats = max_query_repeats
+        self.max_item_size = max_item_size
+
+    def check_content_length(self, content_length: Optional[int]) -> None:
+        if self.max_body_size is not None and content_length and content_length > self.max_body_size:
+            raise RequestEntityTooLarge(f"Request body is larger than {self.max_body_size} bytes.")
+
+    def read(self, stream: IO[bytes]) -> bytes:
+        """Body sent without Content-Length, never more than one byte over max_body_size is read."""
+        if self.max_body_size is None:
+            return stream.read()
+        data = stream.read(self.max_body_size + 1)
+        self.check_content_length(len(data))
+        return data
+
+    def limit_stream(self, stream: IO[bytes]) -> IO[bytes]:
+        """Body of a `Stream`, read while view-func iterates it, past max_body_size it raises 413."""
+        if self.max_body_size is None:
+            return stream
+        return _LimitedStream(stream, self)
+
+    def depth_error(self, model: Type[BaseModel]) -> ValidationError:
+        return _error(DEPTH_LIMIT, self.max_depth, 'body', model)
+
+    def check_json(self, obj: Any, model: Type[BaseModel]) -> None:
+        """Depth and array lengths of the parsed json body."""
+        if self.max_depth is None and self.max_items is None:
+            return
+        max_depth = self.max_depth or float('inf')
+        max_items = self.max_items if self.max_items is not None else float('inf')
+        # one level of nesting at a time, the objects and arrays at depth
+        level, depth = [obj] if isinstance(obj, (dict, list)) else [], 1
+        while level:
+            if depth > max_depth:
+                raise self.depth_error(model)
+            children = []
+            for value in level:
+                if isinstance(value, dict):
+                    value = value.values()
+                elif len(value) > max_items:
+                    raise _error(ITEMS_LIMIT, self.max_items, 'body', model)
+                children += [v for v in value if isinstance(v, (dict, list))]
+            level, depth = children, depth + 1
+
+    def check_query(self, query_string: bytes, args: MultiDict, model: Type[BaseModel]) -> None:
+        if self.max_query_params is not None and query_string \
+                and query_string.count(b'&') + 1 > self.max_query_params:
+            raise _error(QUERY_PARAMS_LIMIT, self.max_query_params, 'query', model)
+        if self.max_query_repeats is not None and args \
+                and max(map(len, args.listvalues())) > self.max_query_repeats:
+            raise _error(QUERY_REPEATS_LIMIT, self.max_query_repeats, 'query', model)
+
+    def spec(self) -> dict:
+        """``x-limits`` extension of the documented operation"""
+        return {
+            k: v for k, v in (
+                ("maxBodySize", self.max_body_size),
+                ("maxItems", self.max_items),
+                ("maxDepth", self.max_depth),
+                ("maxQueryParams", self.max_query_params),
+                ("maxQueryRepeats", self.max_query_repeats),
+                ("maxItemSize", self.max_item_size),
+            ) if v is not None
+        }
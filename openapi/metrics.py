@@ -0,0 +1,127 @@
+"""Per-endpoint timings and validation errors of documented requests"""
+import threading
+from bisect import bisect_left
+from time import perf_counter
+from typing import Tuple, Iterable
+from flask import request
+from pydantic import ValidationError
+from .until import _parse_rule
+from .compat import errors
+
+DEFAULT_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class MetricsSink:
+    """Receives the measurements of `OpenApi(metrics=...)`, subclass to forward them to statsd, otel...
+
+    Phases of a request: ``bind`` parses and validates the path/query/form/body/header/cookie
+    models, ``view`` runs view-func, ``validate_response`` checks the sampled responses and
+    ``serialize`` builds the response. Endpoints are keyed by openapi path template and method.
+    """
+
+    def timing(self, path: str, method: str, phase: str, seconds: float) -> None:
+        pass
+
+    def validation_error(self, path: str, method: str, field: str) -> None:
+        pass
+
+    def observe(self, phase: str, start: float) -> float:
+        """Record the time since start for the current request, return the new start."""
+        now = perf_counter()
+        self.timing(*endpoint_key(), phase, now - start)
+        return now
+
+    def observe_validation_error(self, e: ValidationError) -> None:
+        self.observe_errors(errors(e))
+
+    def observe_errors(self, errors_: Iterable[dict]) -> None:
+        """Count the `compat.errors` of the current request by field."""
+        path, method = endpoint_key()
+        for error in errors_:
+            # list indexes are dropped, one series per field rather than per item
+            field = '.'.join(str(loc) for loc in error['loc'] if not isinstance(loc, int)) or '__root__'
+            self.validation_error(path, method, field)
+
+
+_templates = {}
+
+
+def endpoint_key() -> Tuple[str, str]:
+    """(openapi path template, method) of the current request"""
+    rule = request.url_rule.rule if request.url_rule is not None else request.path
+    path = _templates.get(rule)
+    if path is None:
+        path = _templates[rule] = _parse_rule(rule)
+    return path, request.method
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    return ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+
+class PrometheusMetrics(MetricsSink):
+    """In-process histograms and counters, rendered in the prometheus text format
+    by ``/<api_name>/metrics`` on the docs blueprint.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS, namespace: str = 'openapi'):
+        self.buckets = tuple(sorted(buckets))
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._timings = {}  # (path, method, phase) -> [bucket counts..., sum, count]
+        self._errors = {}  # (path, method, field) -> count
+
+    def timing(self, path: str, method: str, phase: str, seconds: float) -> None:
+        key = (path, method, phase)
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._timings.get(key)
+            if series is None:
+                series = self._timings[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def validation_error(self, path: str, method: str, field: str) -> None:
+        key = (path, method, field)
+        with self._lock:
+            self._errors[key] = self._errors.get(key, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._timings.clear()
+            self._errors.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        seconds = f'{self.namespace}_request_phase_seconds'
+        errors = f'{self.namespace}_validation_errors_total'
+        with self._lock:
+            timings = sorted((k, list(v)) for k, v in self._timings.items())
+            counts = sorted(self._errors.items())
+        lines = [
+            f'# HELP {seconds} Time spent in each phase of documented requests.',
+            f'# TYPE {seconds} histogram',
+        ]
+        for (path, method, phase), series in timings:
+            labels = _labels(path=path, method=method, phase=phase)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{seconds}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{seconds}_bucket{{{labels},le="+Inf"}} {series[-1]}')
+            lines.append(f'{seconds}_sum{{{labels}}} {series[-2]}')
+            lines.append(f'{seconds}_count{{{labels}}} {series[-1]}')
+        lines.extend((
+            f'# HELP {errors} Request validation errors (422) by field.',
+            f'# TYPE {errors} counter',
+        ))
+        for (path, method, field), count in counts:
+            lines.append(f'{errors}{{{_labels(path=path, method=method, field=field)}}} {count}')
+        return '\n'.join(lines) + '\n'
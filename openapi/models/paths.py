@@ -33,6 +33,8 @@ class Operation(BaseModel):
     requestBody: Union[RequestBody, Reference] = None
     responses: Dict[str, Response] = None
     security: List[Dict[str, List[str]]] = None
+    x_cache: Dict[str, Any] = Field(None, alias="x-cache")
+    x_limits: Dict[str, int] = Field(None, alias="x-limits")
 
 
 class PathItem(BaseModel):
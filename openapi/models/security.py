@@ -22,18 +22,18 @@ class APIKeyIn(str, Enum):
 
 
 class APIKey(SecurityBase):
-    type_ = Field(default=SecuritySchemeType.apiKey, alias='type')
+    type_: SecuritySchemeType = Field(default=SecuritySchemeType.apiKey, alias='type')
     in_: APIKeyIn = Field(..., alias='in')
     name: str
 
 
 class HTTPBase(SecurityBase):
-    type_ = Field(default=SecuritySchemeType.http, alias='type')
+    type_: SecuritySchemeType = Field(default=SecuritySchemeType.http, alias='type')
     scheme: str
 
 
 class HTTPBearer(HTTPBase):
-    scheme = 'bearer'
+    scheme: str = 'bearer'
     bearerFormat: str = None
 
 
@@ -67,12 +67,12 @@ class OAuthFlows(BaseModel):
 
 
 class OAuth2(SecurityBase):
-    type_ = Field(default=SecuritySchemeType.oauth2, alias='type')
+    type_: SecuritySchemeType = Field(default=SecuritySchemeType.oauth2, alias='type')
     flows: OAuthFlows
 
 
 class OpenIdConnect(SecurityBase):
-    type_ = Field(default=SecuritySchemeType.openIdConnect, alias='type')
+    type_: SecuritySchemeType = Field(default=SecuritySchemeType.openIdConnect, alias='type')
     openIdConnectUrl: str
 
 
@@ -16,14 +16,14 @@ class Schema(BaseModel):
     exclusiveMaximum: float = None
     minimum: float = None
     exclusiveMinimum: float = None
-    maxLength: int = Field(None, gte=0)
-    minLength: int = Field(None, gte=0)
+    maxLength: int = Field(None, ge=0)
+    minLength: int = Field(None, ge=0)
     pattern: str = None
-    maxItems: int = Field(None, gte=0)
-    minItems: int = Field(None, gte=0)
+    maxItems: int = Field(None, ge=0)
+    minItems: int = Field(None, ge=0)
     uniqueItems: bool = None
-    maxProperties: int = Field(None, gte=0)
-    minProperties: int = Field(None, gte=0)
+    maxProperties: int = Field(None, ge=0)
+    minProperties: int = Field(None, ge=0)
     required: List[str] = None
     enum: List[Any] = None
     type: str = None
@@ -57,6 +57,12 @@ class MediaType(BaseModel):
     encoding: Dict[str, Encoding] = None
 
 
+class Header(BaseModel):
+    description: str = None
+    schema_: Union[Schema, Reference] = Field(None, alias='schema')
+
+
 class Response(BaseModel):
     description: str = None
+    headers: Dict[str, Header] = None
     content: Dict[str, MediaType] = None
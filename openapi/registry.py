@@ -0,0 +1,71 @@
+"""Component schemas shared by every endpoint"""
+import inspect
+from typing import Type, Callable, Any
+from pydantic import BaseModel
+from .models.apispec import OPENAPI3_REF_TEMPLATE, OPENAPI3_REF_PREFIX
+from .spec import schema_dict
+from .compat import model_schema
+
+
+class SchemaRegistry(dict):
+    """`Components.schemas` built once per model.
+
+    Each model class is converted to an openapi schema a single time, its
+    definitions are merged into the components, and a name already used by a
+    different schema is rejected instead of being silently overwritten.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._schemas = {}  # model -> openapi schema
+        self._sources = {}  # component name -> raw schema, to detect collisions
+        self._registered = {}  # (model, name) -> reference
+        self._refs = {}  # component name -> reference
+        self._parsed = {}  # memoized parse results, see `cached`
+
+    def schema(self, model: Type[BaseModel]) -> dict:
+        """Pydantic model conversion to openapi schema"""
+        schema = self._schemas.get(model)
+        if schema is None:
+            assert inspect.isclass(model) and \
+                   issubclass(model, BaseModel), f"{model} is invalid `pydantic.BaseModel`"
+            schema = self._schemas[model] = model_schema(model, OPENAPI3_REF_TEMPLATE)
+        return schema
+
+    def ref(self, name: str) -> dict:
+        ref = self._refs.get(name)
+        if ref is None:
+            ref = self._refs[name] = {"$ref": f"{OPENAPI3_REF_PREFIX}/{name}"}
+        return ref
+
+    def add(self, name: str, value: dict) -> None:
+        """Add a component schema, asserting the name is not taken by another schema."""
+        value = {k: v for k, v in value.items() if k != 'definitions'}
+        source = self._sources.get(name)
+        if source is None:
+            self._sources[name] = value
+            self[name] = schema_dict(value)
+            return
+        assert source == value, f"Schema name `{name}` is used by two different models."
+
+    def add_definitions(self, model: Type[BaseModel]) -> None:
+        for name, value in self.schema(model).get('definitions', {}).items():
+            self.add(name, value)
+
+    def register(self, model: Type[BaseModel], name: str = None) -> dict:
+        """Add model and its definitions to the components, return the `$ref` schema."""
+        key = (model, name)
+        ref = self._registered.get(key)
+        if ref is None:
+            schema = self.schema(model)
+            name = name or schema.get('title')
+            self.add(name, schema)
+            self.add_definitions(model)
+            ref = self._registered[key] = self.ref(name)
+        return ref
+
+    def cached(self, key: Any, factory: Callable[[], Any]) -> Any:
+        """Return factory() memoized by key, for parse results shared between endpoints."""
+        if key not in self._parsed:
+            self._parsed[key] = factory()
+        return self._parsed[key]
@@ -0,0 +1,89 @@
+"""Spec objects used to build and store the document.
+
+The pydantic classes of `models` describe the whole openapi document, they are
+only used to validate the result, see `OpenApi.validate_api_doc`. Schemas,
+parameters, request bodies and responses are plain dicts already in their
+serialized form, `Operation` and `PathItem`, which are filled in after they are
+created, are `__slots__` classes holding only the fields that are set.
+"""
+from pydantic import BaseModel
+from .models.swagger import Schema
+from .compat import model_fields
+
+# (key, is float) of every documented schema key, in `Schema` field order
+_SCHEMA_FIELDS = tuple((field.alias, field.annotation is float) for field in model_fields(Schema))
+
+
+def schema_dict(value: dict) -> dict:
+    """Schema with the keys `models.Schema` documents, the way
+    ``Schema(**value).dict(by_alias=True, exclude_none=True)`` orders and coerces them.
+    """
+    schema = {}
+    for key, is_float in _SCHEMA_FIELDS:
+        v = value.get(key)
+        if v is not None:
+            schema[key] = float(v) if is_float else v
+    return schema
+
+
+def compact(value: dict) -> dict:
+    """Drop the keys set to None"""
+    return {k: v for k, v in value.items() if v is not None}
+
+
+def _tag_names(tags: list) -> list:
+    """`Tag` objects to the names an operation lists"""
+    return [tag.name if isinstance(tag, BaseModel) else tag for tag in tags]
+
+
+def _requirements(security: list) -> list:
+    """Security requirements ``{scheme name: [scope...]}``, the scheme objects given as values have no scope."""
+    if isinstance(security, dict):
+        security = [security]
+    return [
+        {name: list(value) if isinstance(value, (list, tuple)) else [] for name, value in requirement.items()}
+        for requirement in security
+    ]
+
+
+class Operation:
+    __slots__ = ('tags', 'summary', 'description', 'parameters', 'requestBody', 'responses', 'security', 'x_cache',
+                 'x_limits')
+
+    def __init__(self, summary: str = None, description: str = None):
+        self.tags = None
+        self.summary = summary
+        self.description = description
+        self.parameters = None
+        self.requestBody = None
+        self.responses = None
+        self.security = None
+        self.x_cache = None
+        self.x_limits = None
+
+    def to_dict(self) -> dict:
+        return compact({
+            "tags": _tag_names(self.tags) if self.tags else None,
+            "summary": self.summary,
+            "description": self.description,
+            "parameters": self.parameters,
+            "requestBody": self.requestBody,
+            "responses": self.responses,
+            "security": _requirements(self.security) if self.security else None,
+            "x-cache": self.x_cache,
+            "x-limits": self.x_limits,
+        })
+
+
+class PathItem:
+    __slots__ = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+
+    def __init__(self, **operations: Operation):
+        for method in self.__slots__:
+            setattr(self, method, operations.get(method))
+
+    def to_dict(self) -> dict:
+        return {
+            method: operation.to_dict()
+            for method, operation in ((m, getattr(self, m)) for m in self.__slots__) if operation is not None
+        }
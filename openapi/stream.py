@@ -0,0 +1,217 @@
+"""Streaming request bodies, annotate view-func with ``body: Stream[Item]``"""
+import re
+import json
+import codecs
+import logging
+from typing import Type, Iterator, Iterable, Any, IO, Callable
+from pydantic import BaseModel, ValidationError
+from .compat import validate as validate_model, dump, errors, validation_error, prefix_errors
+from .limits import ITEMS_LIMIT, ITEM_SIZE_LIMIT
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl')
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# a value cut by the end of the buffer fails at most this far from it (``-Infinit``),
+# or at the opening quote of a string still open
+_TRUNCATED_TAIL = len('-Infinity')
+
+logger = logging.getLogger(__name__)
+
+
+class StreamValidationError(ValidationError):
+    """An item of a `Stream` body is invalid, raised while view-func iterates the body."""
+
+
+class Stream:
+    """Request body parsed incrementally from ``request.stream``.
+
+    A JSON array (``application/json``) or newline delimited JSON
+    (``application/x-ndjson``) is read chunk by chunk and each element is
+    validated as ``model`` when it is reached, so the body is never held in
+    memory as a whole. Iterating raises `StreamValidationError` at the first
+    invalid item, `iter_valid` skips invalid items and records their errors
+    in ``errors`` instead. Both raise at the item after ``max_items``, and when
+    an item grows over ``max_item_size`` characters before it is complete.
+    """
+    model: Type[BaseModel] = None
+    chunk_size = 64 * 1024
+    _types = {}
+
+    def __class_getitem__(cls, model: Type[BaseModel]) -> Type['Stream']:
+        if model not in cls._types:
+            cls._types[model] = type(f'Stream[{model.__name__}]', (cls,), {'model': model})
+        return cls._types[model]
+
+    def __init__(self, stream: IO[bytes], ndjson: bool = False, loads=json.loads, max_items: int = None,
+                 max_item_size: int = None):
+        assert self.model is not None, "Use `Stream[Model]` to declare the item model."
+        self.stream = stream
+        self.ndjson = ndjson
+        self.loads = loads
+        self.max_items = max_items
+        self.max_item_size = max_item_size
+        self.errors = []
+        self.count = 0
+
+    def _json_error(self) -> StreamValidationError:
+        return validation_error(self.model, (self.count,), 'json', 'Invalid JSON', cls=StreamValidationError)
+
+    def _check_size(self, size: int) -> None:
+        """size of the incomplete item buffered"""
+        if self.max_item_size is not None and size > self.max_item_size:
+            raise validation_error(self.model, (self.count,), *ITEM_SIZE_LIMIT, cls=StreamValidationError,
+                                   limit_value=self.max_item_size)
+
+    def _validate(self, obj: Any) -> BaseModel:
+        try:
+            return validate_model(self.model, obj)
+        except ValidationError as e:
+            raise prefix_errors(e, (self.count,), self.model, cls=StreamValidationError)
+
+    def _iter_ndjson(self) -> Iterator[Any]:
+        rest = b''
+        while True:
+            chunk = self.stream.read(self.chunk_size)
+            lines = (rest + chunk).split(b'\n')
+            rest = lines.pop() if chunk else b''
+            self._check_size(len(rest))
+            for line in lines:
+                if line.strip():
+                    try:
+                        yield self.loads(line)
+                    except ValueError:
+                        raise self._json_error()
+            if not chunk:
+                return
+
+    def _iter_array(self) -> Iterator[Any]:
+        decoder = json.JSONDecoder()
+        text = codecs.getincrementaldecoder('utf-8')()
+        buf, pos, eof = '', 0, False
+        expect, first = '[', True
+        while True:
+            pos = _WHITESPACE.match(buf, pos).end()
+            if pos == len(buf) and eof:
+                if expect != 'end':
+                    raise self._json_error()
+                return
+            if pos < len(buf):
+                char = buf[pos]
+                if expect == 'value' and not (first and char == ']'):
+                    try:
+                        obj, end = decoder.raw_decode(buf, pos)
+                    except json.JSONDecodeError as e:
+                        if eof or (e.pos < len(buf) - _TRUNCATED_TAIL
+                                   and not e.msg.startswith('Unterminated string')):
+                            raise self._json_error()
+                        end = len(buf)
+                    # a value reaching the end of the buffer may continue in the next chunk
+                    if end < len(buf) or eof:
+                        pos, expect, first = end, ',', False
+                        yield obj
+                        continue
+                elif expect == '[' and char == '[':
+                    pos, expect = pos + 1, 'value'
+                    continue
+                elif (expect == 'value' and first) or (expect == ',' and char == ']'):
+                    pos, expect = pos + 1, 'end'
+                    continue
+                elif expect == ',' and char == ',':
+                    pos, expect = pos + 1, 'value'
+                    continue
+                else:
+                    raise self._json_error()
+            if expect == 'value':
+                self._check_size(len(buf) - pos)  # of the item still incomplete
+            # read at least as much as is buffered, so a large item is decoded O(log n) times
+            chunk = self.stream.read(max(self.chunk_size, len(buf) - pos))
+            eof = not chunk
+            buf, pos = buf[pos:] + text.decode(chunk, final=eof), 0
+
+    def _iter_objects(self) -> Iterator[Any]:
+        objects = self._iter_ndjson() if self.ndjson else self._iter_array()
+        if self.max_items is None:
+            return objects
+        return self._iter_limited(objects)
+
+    def _iter_limited(self, objects: Iterator[Any]) -> Iterator[Any]:
+        for obj in objects:
+            if self.count >= self.max_items:
+                raise validation_error(self.model, (self.count,), *ITEMS_LIMIT, cls=StreamValidationError,
+                                       limit_value=self.max_items)
+            yield obj
+
+    def __iter__(self) -> Iterator[BaseModel]:
+        for obj in self._iter_objects():
+            item = self._validate(obj)
+            self.count += 1
+            yield item
+
+    def iter_valid(self) -> Iterator[BaseModel]:
+        """Yield the valid items, errors of the invalid ones are appended to ``errors``."""
+        for obj in self._iter_objects():
+            try:
+                item = self._validate(obj)
+            except StreamValidationError as e:
+                self.errors.extend(errors(e))
+            else:
+                yield item
+            self.count += 1
+
+
+def is_stream(model: Any) -> bool:
+    return isinstance(model, type) and issubclass(model, Stream)
+
+
+class _ErrorRecord(dict):
+    """Last item of a streamed response whose `Stream` body turned out invalid"""
+
+
+def _until_invalid(items: Iterable[Any], on_error: Callable[[StreamValidationError], Any] = None) -> Iterator[Any]:
+    try:
+        yield from items
+    except StreamValidationError as e:
+        logger.warning("Stream body invalid after the response started", extra={"errors": errors(e)})
+        if on_error is not None:
+            on_error(e)
+        yield _ErrorRecord(errors=errors(e))
+
+
+def iter_json_chunks(items: Iterable[Any], dumps: Callable[[Any], bytes], model: Type[BaseModel] = None,
+                     ndjson: bool = False, validate: bool = False, chunk_size: int = 64 * 1024,
+                     on_error: Callable[[StreamValidationError], Any] = None) -> Iterator[bytes]:
+    """Serialize items as a json array (or ndjson), yielding about chunk_size bytes at a time.
+
+    Items are models or plain rows, rows are checked against model when validate
+    is set and failures are logged, the response has already started by then.
+    Items read from a `Stream` body that is invalid end with an error record
+    ``{"errors": [...]}``, the 422 errors of the body, the failure is logged and
+    passed to on_error.
+    """
+    sep = b'\n' if ndjson else b','
+    buf = [] if ndjson else [b'[']
+    size = 0
+    for index, item in enumerate(_until_invalid(items, on_error)):
+        if isinstance(item, BaseModel):
+            item = dump(item, by_alias=True)
+        elif validate and model is not None and not isinstance(item, _ErrorRecord):
+            try:
+                validate_model(model, item)
+            except ValidationError as e:
+                logger.warning(
+                    "Response item %s validation failed: %s", index, model.__name__,
+                    extra={"index": index, "model": model.__name__, "errors": errors(e)}
+                )
+        data = dumps(item)
+        if index and not ndjson:
+            buf.append(sep)
+        buf.append(data)
+        if ndjson:
+            buf.append(sep)
+        size += len(data) + 1
+        if size >= chunk_size:
+            yield b''.join(buf)
+            buf, size = [], 0
+    if not ndjson:
+        buf.append(b']')
+    if buf:
+        yield b''.join(buf)
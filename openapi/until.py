@@ -1,31 +1,39 @@
 """公共解析函数"""
+import os
+import json
 import inspect
-from typing import Type, Dict, Callable, List, Tuple, Any
-from pydantic import BaseModel
+import logging
+from typing import Type, Dict, Callable, List, Any
+from pydantic import BaseModel, ValidationError
 from .models.apispec import OPENAPI3_REF_TEMPLATE, OPENAPI3_REF_PREFIX
-from .models.paths import Operation, Parameter, ParameterInType, Schema, Response, PathItem, MediaType, \
-    UnprocessableEntity, RequestBody
+from .models.paths import ParameterInType, UnprocessableEntity
+from .spec import Operation, PathItem, schema_dict, compact
 from .status import HTTP_STATUS
+from .registry import SchemaRegistry
+from .stream import NDJSON_MIMETYPES, is_stream
+from .validator import FileStorage
+from .binder import header_name
+from .compat import model_fields, model_schema, inner_type, validate, errors
 from werkzeug.routing import parse_rule
 
 from http import HTTPStatus
 from flask import Response as _Response
 
+logger = logging.getLogger(__name__)
 
-Response_422 = Response(
-    description=HTTP_STATUS["422"],
-    content={
-        "application/json": MediaType(
-            **{"schema": Schema(
-                **{"type": "array",
-                   "items": {"$ref": f"{OPENAPI3_REF_PREFIX}/{UnprocessableEntity.__name__}"}
-                   }
-            )
+
+Response_422 = {
+    "description": HTTP_STATUS["422"],
+    "content": {
+        "application/json": {
+            "schema": {
+                "type": "array",
+                "items": {"$ref": f"{OPENAPI3_REF_PREFIX}/{UnprocessableEntity.__name__}"}
             }
-        )
+        }
     }
-)
-Response_500 = Response(description=HTTP_STATUS["500"])
+}
+Response_500 = {"description": HTTP_STATUS["500"]}
 
 
 def _parse_rule(rule: str) -> str:
@@ -68,162 +76,132 @@ def get_schema(obj: Type[BaseModel]) -> dict:
     """Pydantic model conversion to openapi schema"""
     assert inspect.isclass(obj) and \
            issubclass(obj, BaseModel), f"{obj} is invalid `pydantic.BaseModel`"
-    return obj.schema(ref_template=OPENAPI3_REF_TEMPLATE)
+    return model_schema(obj, OPENAPI3_REF_TEMPLATE)
 
 
-def parse_query(query: Type[BaseModel]) -> Tuple[List[Parameter], dict]:
-    """Parse query model"""
-    schema = get_schema(query)
+def _parse_parameters(model: Type[BaseModel], registry: SchemaRegistry, in_: ParameterInType) -> List[dict]:
+    schema = registry.schema(model)
     parameters = []
-    components_schemas = dict()
-    properties = schema.get('properties')
-    definitions = schema.get('definitions')
-
-    if properties:
-        for name, value in properties.items():
-            data = {
-                "name": name,
-                "in": ParameterInType.query,
-                "description": value.get("description"),
-                "required": name in schema.get("required", []),
-                "schema": Schema(**value)
+    for name, value in schema.get('properties', {}).items():
+        data = {
+            "name": header_name(name) if in_ == ParameterInType.header else name,
+            "in": in_.value,
+            "description": value.get("description"),
+            "required": True if in_ == ParameterInType.path else name in schema.get("required", []),
+            "schema": schema_dict(value)
+        }
+        parameters.append(compact(data))
+    registry.add_definitions(model)
+    return parameters
+
+
+def parse_query(query: Type[BaseModel], registry: SchemaRegistry) -> List[dict]:
+    """Parse query model"""
+    return registry.cached(
+        (query, ParameterInType.query),
+        lambda: _parse_parameters(query, registry, ParameterInType.query))
+
+
+def parse_header(header: Type[BaseModel], registry: SchemaRegistry) -> List[dict]:
+    """Parse header model"""
+    return registry.cached(
+        (header, ParameterInType.header),
+        lambda: _parse_parameters(header, registry, ParameterInType.header))
+
+
+def parse_cookie(cookie: Type[BaseModel], registry: SchemaRegistry) -> List[dict]:
+    """Parse cookie model"""
+    return registry.cached(
+        (cookie, ParameterInType.cookie),
+        lambda: _parse_parameters(cookie, registry, ParameterInType.cookie))
+
+
+def parse_body(body: Type[BaseModel], registry: SchemaRegistry) -> Dict[str, dict]:
+    """Parse body model, `Stream[Model]` is documented as a json array and ndjson."""
+    def parse():
+        if is_stream(body):
+            ref = registry.register(body.model)
+            content = {"application/json": {"schema": {"type": "array", "items": ref}}}
+            for mimetype in NDJSON_MIMETYPES:
+                content[mimetype] = {"schema": ref}
+            return content
+        if not registry.schema(body).get('properties'):
+            registry.add_definitions(body)
+            return None
+        return {
+            "application/json": {
+                "schema": registry.register(body)
             }
-            parameters.append(Parameter(**data))
-    if definitions:
-        for name, value in definitions.items():
-            components_schemas[name] = Schema(**value)
-    return parameters, components_schemas
-
-
-def parse_body(body: Type[BaseModel]) -> Tuple[Dict[str, MediaType], dict]:
-    """Parse body model"""
-    schema = get_schema(body)
-    content = None
-    components_schemas = dict()
-    properties = schema.get('properties')
-    definitions = schema.get('definitions')
-
-    if properties:
-        title = schema.get('title')
-        components_schemas[title] = Schema(**schema)
-        content = {
-            "application/json": MediaType(
-                **{
-                    "schema": Schema(
-                        **{
-                            "$ref": f"{OPENAPI3_REF_PREFIX}/{title}"
-                        }
-                    )
-                }
-            )
         }
-    if definitions:
-        for name, value in definitions.items():
-            components_schemas[name] = Schema(**value)
-    return content, components_schemas
+    return registry.cached((body, 'body'), parse)
 
 
-def parse_path(path: Type[BaseModel]) -> Tuple[List[Parameter], dict]:
+def parse_path(path: Type[BaseModel], registry: SchemaRegistry) -> List[dict]:
     """Parse path model"""
-    schema = get_schema(path)
-    parameters = []
-    components_schemas = dict()
-    properties = schema.get('properties')
-    definitions = schema.get('definitions')
-
-    if properties:
-        for name, value in properties.items():
-            data = {
-                "name": name,
-                "in": ParameterInType.path,
-                "description": value.get("description"),
-                "required": True,
-                "schema": Schema(**value)
-            }
-            parameters.append(Parameter(**data))
-    if definitions:
-        for name, value in definitions.items():
-            components_schemas[name] = Schema(**value)
-    return parameters, components_schemas
+    return registry.cached(
+        (path, ParameterInType.path),
+        lambda: _parse_parameters(path, registry, ParameterInType.path))
 
 
-def parse_form(form: Type[BaseModel]) -> Tuple[Dict[str, MediaType], dict]:
+def parse_form(form: Type[BaseModel], registry: SchemaRegistry) -> Dict[str, dict]:
     """Parse form model"""
-    schema = get_schema(form)
-    content = None
-    components_schemas = dict()
-    properties = schema.get('properties')
-    definitions = schema.get('definitions')
-
-    if properties:
-        title = schema.get('title')
-        components_schemas[title] = Schema(**schema)
+    def parse():
+        properties = registry.schema(form).get('properties')
+        assert properties, f"{form.__name__}'s properties cannot be empty."
         encoding = {}
-        for k, v in form.schema().get('properties', {}).items():
+        for k, v in properties.items():
             if v.get('type') == 'array':
                 encoding[k] = {'style': 'form'}
-
-        content = {
-            "multipart/form-data": MediaType(
-                **{
-                    "schema": Schema(
-                        **{
-                            "$ref": f"{OPENAPI3_REF_PREFIX}/{title}"
-                        }
-                    ),
-                    "encoding": encoding
+        for field in model_fields(form):
+            type_ = inner_type(field.annotation)
+            if isinstance(type_, type) and issubclass(type_, FileStorage) and type_.content_types:
+                encoding.setdefault(field.alias, {})['contentType'] = ', '.join(sorted(type_.content_types))
+        return {
+            "multipart/form-data": {
+                "schema": registry.register(form),
+                "encoding": {
+                    # `models.Encoding` field order and default
+                    k: compact({"contentType": v.get('contentType'), "style": v.get('style'), "explode": True})
+                    for k, v in encoding.items()
                 }
-            )
+            }
         }
-    if definitions:
-        for name, value in definitions.items():
-            components_schemas[name] = Schema(**value)
+    return registry.cached((form, 'form'), parse)
 
-    assert content is not None, f"{form.__name__}'s properties cannot be empty."
 
-    return content, components_schemas
+def _response_content(response: Type[BaseModel], registry: SchemaRegistry) -> Dict[str, dict]:
+    if is_stream(response):
+        ref = registry.register(response.model, response.model.__name__)
+        return {
+            "application/json": {"schema": {"type": "array", "items": ref}},
+            NDJSON_MIMETYPES[0]: {"schema": ref}
+        }
+    return {
+        "application/json": {
+            "schema": registry.register(response, response.__name__)
+        }
+    }
 
 
-def get_responses(responses: dict, components_schemas: dict, operation: Operation) -> None:
+def get_responses(responses: dict, components_schemas: SchemaRegistry, operation: Operation) -> None:
     """
     :param responses: Dict[str, BaseModel]
-    :param components_schemas: `models.component.py` Components.schemas
+    :param components_schemas: `registry.py` SchemaRegistry, Components.schemas
     :param operation: `models.path.py` Operation
     """
     if responses is None:
         responses = {}
     _responses = {}
-    _schemas = {}
     if not responses.get("422"):
         _responses["422"] = Response_422
-        _schemas[UnprocessableEntity.__name__] = Schema(**UnprocessableEntity.schema())
+        components_schemas.register(UnprocessableEntity, UnprocessableEntity.__name__)
     if not responses.get("500"):
         _responses["500"] = Response_500
     for key, response in responses.items():
-        assert inspect.isclass(response) and \
-               issubclass(response, BaseModel), f" {response} is invalid `pydantic.BaseModel`"
-        schema = response.schema(ref_template=OPENAPI3_REF_TEMPLATE)
-        _responses[key] = Response(
-            description=HTTP_STATUS.get(key, ""),
-            content={
-                "application/json": MediaType(
-                    **{
-                        "schema": Schema(
-                            **{
-                                "$ref": f"{OPENAPI3_REF_PREFIX}/{response.__name__}"
-                            }
-                        )
-                    }
-                )
-            }
-        )
-        _schemas[response.__name__] = Schema(**schema)
-        definitions = schema.get('definitions')
-        if definitions:
-            for name, value in definitions.items():
-                _schemas[name] = Schema(**value)
-
-    components_schemas.update(**_schemas)
+        _responses[key] = components_schemas.cached((response, 'response', key), lambda: {
+            "description": HTTP_STATUS.get(key, ""),
+            "content": _response_content(response, components_schemas)
+        })
     operation.responses = _responses
 
 
@@ -261,69 +239,83 @@ def bind_path_method_info(uri: str, method: str, paths: dict, operation: Operati
             paths[uri].delete = operation
 
 
-def validate_response(resp: Any, responses: Dict[str, Type[BaseModel]]) -> None:
-    """Validate response"""
-    print("Warning: "
-          "You are using `VALIDATE_RESPONSE=True`, "
-          "please do not use it in the production environment, "
-          "because it will reduce the performance.")
+def validate_response(resp: Any, responses: Dict[str, Type[BaseModel]], endpoint: str = None) -> bool:
+    """Validate the value returned by view-func against the model of its status code.
+
+    Failures are logged to the ``openapi.until`` logger and never raised, so it
+    can stay enabled (sampled) in production. Return False when validation failed.
+    """
     if isinstance(resp, tuple):  # noqa
-        _resp, status_code = resp[:2]
+        _resp, status_code = resp[0], resp[1] if len(resp) > 1 else 200
+        if not isinstance(status_code, int):  # (body, headers)
+            status_code = 200
+        if isinstance(_resp, _Response):
+            if _resp.mimetype != "application/json":
+                return True
+            _resp = _resp.get_json(silent=True)
     elif isinstance(resp, _Response):
         if resp.mimetype != "application/json":
             # only application/json
-            return
-            # raise TypeError("`Response` mimetype must be application/json.")
-        _resp, status_code = resp.json, resp.status_code  # noqa
+            return True
+        _resp, status_code = resp.get_json(silent=True), resp.status_code  # noqa
     else:
         _resp, status_code = resp, 200
     if isinstance(status_code, HTTPStatus):
         status_code = status_code.value
 
     resp_model = responses.get(str(status_code))
-    if resp_model is None:
-        return
-    assert inspect.isclass(resp_model) and \
-           issubclass(resp_model, BaseModel), f"{resp_model} is invalid `pydantic.BaseModel`"
+    if resp_model is None or is_stream(resp_model):
+        return True
     try:
-        resp_model(**_resp)
-    except TypeError:
-        raise TypeError(f"`{resp_model.__name__}` validation failed, must be a mapping.")
+        validate(resp_model, _resp)
+    except ValidationError as e:
+        errors_ = errors(e)
+    else:
+        return True
+    logger.warning(
+        "Response validation failed: %s %s %s",
+        endpoint, status_code, resp_model.__name__,
+        extra={"endpoint": endpoint, "status_code": status_code, "model": resp_model.__name__, "errors": errors_}
+    )
+    return False
 
 
-def parse_func_info(func, components_schemas, operation):
-    """函数信息解析 参数 文档..."""
-    parameters = []
+def get_func_models(func):
+    """Return the query, body, path, form, header, cookie models annotated on view-func."""
     query = get_func_parameter(func, 'query')
     body = get_func_parameter(func, 'body')
     path = get_func_parameter(func, 'path')
     form = get_func_parameter(func, 'form')
+    header = get_func_parameter(func, 'header')
+    cookie = get_func_parameter(func, 'cookie')
+    return query, body, path, form, header, cookie
+
+
+def parse_func_info(func, components_schemas, operation):
+    """函数信息解析 参数 文档...
+
+    :param components_schemas: `registry.py` SchemaRegistry
+    """
+    parameters = []
+    query, body, path, form, header, cookie = get_func_models(func)
     if query:
-        _parameters, _components_schemas = parse_query(query)
-        parameters.extend(_parameters)
-        components_schemas.update(**_components_schemas)
+        parameters.extend(parse_query(query, components_schemas))
     if body:
-        _content, _components_schemas = parse_body(body)
-        components_schemas.update(**_components_schemas)
-        requestBody = RequestBody(**{
-            "content": _content,
-        })
-        operation.requestBody = requestBody
+        _content = parse_body(body, components_schemas)
+        operation.requestBody = compact({"content": _content, "required": True})
     if path:
-        _parameters, _components_schemas = parse_path(path)
-        parameters.extend(_parameters)
-        components_schemas.update(**_components_schemas)
+        parameters.extend(parse_path(path, components_schemas))
     if form:
-        _content, _components_schemas = parse_form(form)
-        components_schemas.update(**_components_schemas)
-        requestBody = RequestBody(**{
-            "content": _content,
-        })
-        operation.requestBody = requestBody
+        _content = parse_form(form, components_schemas)
+        operation.requestBody = compact({"content": _content, "required": True})
+    if header:
+        parameters.extend(parse_header(header, components_schemas))
+    if cookie:
+        parameters.extend(parse_cookie(cookie, components_schemas))
 
     operation.parameters = parameters if parameters else None
     func.operation = operation
-    return query, body, path, form
+    return query, body, path, form, header, cookie
 
 
 def add_swagger_info(components_schemas, responses, tags, operation):
@@ -331,31 +323,141 @@ def add_swagger_info(components_schemas, responses, tags, operation):
     operation.tags = tags
 
 
-def bind_rule_swagger(url_map, view_funcs, paths):
-    register_methods = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')  # 只需要记录这五种请求方式
+def add_cache_info(cache, operation: Operation) -> None:
+    """Document the `cache.ResponseCache` policy, ``x-cache`` and the headers of cached 200 responses.
+
+    :param cache: `cache.ResponseCache`
+    :param operation: `models.path.py` Operation
+    """
+    operation.x_cache = cache.spec()
+    # responses keyed by a cookie model are per user
+    by_cookie = any(p.get("in") == ParameterInType.cookie.value for p in operation.parameters or ())
+    vary = list(dict.fromkeys(cache.vary + cache.credential_headers + (("Cookie",) if by_cookie else ())))
+    cache_control = f"private, max-age={int(cache.ttl)}" if by_cookie else cache.cache_control
+    headers = {
+        "Cache-Control": {"description": "Cache policy",
+                          "schema": {"type": "string", "example": cache_control}}
+    }
+    if vary:
+        headers["Vary"] = {"description": "Request headers selecting the cached response",
+                           "schema": {"type": "string", "example": ", ".join(vary)}}
+    # responses are shared between operations, copy before adding the headers
+    response = operation.responses.get("200") or {"description": HTTP_STATUS["200"]}
+    operation.responses["200"] = compact({
+        "description": response.get("description"),
+        "headers": headers,
+        "content": response.get("content")
+    })
+
+
+REGISTER_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')  # 只需要记录这五种请求方式
 
+
+def add_limits_info(limits, operation: Operation) -> None:
+    """Document `limits.RequestLimits`: ``x-limits``, ``maxItems`` of the array query parameters
+    and of `Stream` bodies, and the 413 response.
+
+    :param limits: `limits.RequestLimits`
+    :param operation: `models.path.py` Operation
+    """
+    operation.x_limits = limits.spec()
+    # parameters, bodies and responses are shared between operations, copy before changing them
+    if limits.max_query_repeats is not None and operation.parameters:
+        operation.parameters = [
+            dict(p, schema=_max_items(p["schema"], limits.max_query_repeats))
+            if p["in"] == ParameterInType.query.value and p["schema"].get("type") == "array" else p
+            for p in operation.parameters
+        ]
+    content = operation.requestBody and operation.requestBody.get("content")
+    if limits.max_items is not None and content and "application/json" in content:
+        schema = content["application/json"]["schema"]
+        if schema.get("type") == "array":
+            content = dict(content, **{"application/json": {"schema": _max_items(schema, limits.max_items)}})
+            operation.requestBody = dict(operation.requestBody, content=content)
+    if limits.max_body_size is not None:
+        operation.responses = dict(operation.responses or {}, **{"413": {"description": HTTP_STATUS["413"]}})
+
+
+def _max_items(schema: dict, max_items: int) -> dict:
+    if schema.get("maxItems") is not None and schema["maxItems"] <= max_items:
+        return schema
+    return schema_dict(dict(schema, maxItems=max_items))
+
+
+def blueprint_name(endpoint: str) -> str:
+    """Blueprint of an endpoint, ``''`` for the routes of the app itself."""
+    return endpoint.rpartition('.')[0]
+
+
+def bind_rule(url_rule, func, paths) -> bool:
+    """Add the operations of one url rule to the openapi paths, return whether any was documented.
+
+    :param url_rule: `werkzeug.routing.Rule`
+    :param func: view-func of the rule's endpoint
+    :param paths: openapi doc paths
+    """
+    path = _parse_rule(url_rule.rule)
+    methods = url_rule.methods or ()
+    bound = False
+
+    if getattr(func, 'view_class', False):
+        """MethodView, flask-restful"""
+        for method in REGISTER_METHODS:
+            if method not in methods:
+                continue
+            _func = getattr(func.view_class, method.lower(), None)
+            if not getattr(_func, '_swagger', False):  # 不需要swagger处理的接口
+                continue
+            bind_path_method_info(path, method, paths, _func.operation)
+            bound = True
+        return bound
+
+    if not getattr(func, '_swagger', False):  # 不需要swagger处理的接口
+        """flask app"""
+        return False
+
+    for method in REGISTER_METHODS:
+        if method in methods:
+            bind_path_method_info(path, method, paths, func.operation)
+            bound = True
+    return bound
+
+
+def bind_rule_swagger(url_map, view_funcs, paths):
+    """Bind every rule of url_map, `OpenApi` binds new rules incrementally instead."""
     for url_rule in url_map.iter_rules():
-        path = url_rule.rule
-        func = view_funcs[url_rule.endpoint]
-        methods = url_rule.methods
-
-        if getattr(func, 'view_class', False):
-            """flask-restful"""
-            for method in register_methods:
-                if method not in methods:
-                    continue
-                _func = getattr(func.view_class, method.lower())
-                if not getattr(_func, '_swagger', False):  # 不需要swagger处理的接口
-                    continue
-                bind_path_method_info(path, method, paths, _func.operation)
-            continue
+        bind_rule(url_rule, view_funcs[url_rule.endpoint], paths)
 
-        if not getattr(func, '_swagger', False):  # 不需要swagger处理的接口
-            """flask app"""
-            continue
 
-        path = _parse_rule(path)
-        for method in register_methods:
-            if method in methods:
-                bind_path_method_info(path, method, paths, func.operation)
+def collect_schema_refs(obj: Any, schemas: Dict[str, dict], found: Dict[str, dict] = None) -> Dict[str, dict]:
+    """Component schemas referenced by obj, directly or through other component schemas.
 
+    :param obj: serialized part of the document, e.g. paths
+    :param schemas: serialized `Components.schemas`
+    """
+    if found is None:
+        found = {}
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if key == '$ref' and isinstance(value, str) and value.startswith(OPENAPI3_REF_PREFIX + '/'):
+                name = value[len(OPENAPI3_REF_PREFIX) + 1:]
+                if name not in found and name in schemas:
+                    found[name] = schemas[name]
+                    collect_schema_refs(schemas[name], schemas, found)
+            else:
+                collect_schema_refs(value, schemas, found)
+    elif isinstance(obj, list):
+        for value in obj:
+            collect_schema_refs(value, schemas, found)
+    return found
+
+
+def load_api_doc(filename: str) -> bytes:
+    """Read a prebuilt openapi document (json or yaml) and return it as json bytes."""
+    with open(filename, 'rb') as f:
+        data = f.read()
+    if os.path.splitext(filename)[1] in ('.yaml', '.yml'):
+        import yaml
+        return json.dumps(yaml.safe_load(data), ensure_ascii=False).encode('utf-8')
+    json.loads(data)
+    return data
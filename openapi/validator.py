@@ -1,11 +1,20 @@
-from typing import Any, Dict, Callable
+import io
+import mmap
+from tempfile import SpooledTemporaryFile
+from typing import Any, Dict, Callable, Iterable, Optional, Type
 from werkzeug.datastructures import FileStorage as _FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge
+
+DEFAULT_SPOOL_MAX_SIZE = 1024 * 500
 
 
 class FileStorage(_FileStorage):
     """
     An uploaded file included as part of the request data.
     """
+    max_size: Optional[int] = None
+    content_types: Optional[frozenset] = None
+    spool_max_size: Optional[int] = None
 
     @classmethod
     def __get_validators__(cls) -> 'Callable[..., Any]':
@@ -20,10 +29,123 @@ class FileStorage(_FileStorage):
             format="binary",
             type="string"
         )
+        if cls.max_size is not None:
+            field_schema.update(maxLength=cls.max_size)
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: Any) -> Any:
+        # pydantic v2, v1 uses `__get_validators__`
+        from pydantic_core import core_schema, PydanticCustomError
+
+        def validate(value: Any) -> 'FileStorage':
+            try:
+                return cls.validate(value)
+            except TypeError as e:
+                # only ValueError is a validation error on v2
+                raise PydanticCustomError('type_error', str(e))
+
+        return core_schema.no_info_plain_validator_function(validate)
+
+    @classmethod
+    def __get_pydantic_json_schema__(cls, schema: Any, handler: Any) -> Dict[str, Any]:
+        field_schema = {}
+        cls.__modify_schema__(field_schema)
+        return field_schema
 
     @classmethod
-    def validate(cls, value: Any) -> '_FileStorage':
+    def validate(cls, value: Any) -> 'FileStorage':
         if not isinstance(value, _FileStorage):
             raise TypeError('werkzeug.datastructures.FileStorage required')
+        if cls.content_types is not None and value.mimetype not in cls.content_types:
+            raise ValueError(f"content type `{value.mimetype}` is not one of: {', '.join(sorted(cls.content_types))}")
+        if cls.max_size is not None and _size(value.stream) > cls.max_size:
+            raise ValueError(f"file is larger than {cls.max_size} bytes")
+        if isinstance(value, cls):
+            return value
+        # same stream, nothing is copied
+        return cls(
+            stream=value.stream,
+            filename=value.filename,
+            name=value.name,
+            content_length=value.content_length,
+            headers=value.headers
+        )
+
+    def mmap(self) -> mmap.mmap:
+        """Read-only memory map of the upload, spooled to disk first if it is still in memory."""
+        return mmap.mmap(self.stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def confile(
+        max_size: int = None,
+        content_types: Iterable[str] = None,
+        spool_max_size: int = None
+) -> Type[FileStorage]:
+    """Constrained `FileStorage`, the limits are also enforced while the multipart body is parsed.
+
+    :param max_size: maximum size in bytes, a larger upload is rejected with 413
+    :param content_types: allowed mimetypes, other uploads are discarded unread and fail validation
+    :param spool_max_size: size kept in memory before the upload is written to a temporary file
+    """
+    namespace = dict(
+        max_size=max_size,
+        content_types=frozenset(c.lower() for c in content_types) if content_types is not None else None,
+        spool_max_size=spool_max_size
+    )
+    return type('ConstrainedFileStorage', (FileStorage,), namespace)
+
+
+def _size(stream: Any) -> int:
+    position = stream.tell()
+    size = stream.seek(0, io.SEEK_END)
+    stream.seek(position)
+    return size
+
+
+class _DiscardFile(io.BytesIO):
+    """Sink for uploads that will fail validation, keeps nothing in memory."""
+
+    def write(self, b) -> int:
+        return len(b)
+
+
+class _LimitedSpooledFile(SpooledTemporaryFile):
+    def __init__(self, max_size: int, spool_max_size: int):
+        super().__init__(max_size=spool_max_size)
+        self._limit = max_size
+        self._written = 0
+
+    def write(self, s) -> int:
+        self._written += len(s)
+        if self._limit is not None and self._written > self._limit:
+            raise RequestEntityTooLarge(f"Uploaded file is larger than {self._limit} bytes.")
+        return super().write(s)
+
+
+def make_stream_factory(file_types: Iterable[Type[FileStorage]]) -> Optional[Callable[..., Any]]:
+    """`Request._get_file_stream` enforcing the limits of the file fields of a form model.
+
+    The multipart parser does not tell which field a file belongs to, so the
+    loosest limit of all the fields applies while parsing, each field's own
+    limit is checked by its validator.
+    """
+    file_types = [t for t in file_types if issubclass(t, FileStorage)]
+    if not file_types:
+        return None
+    max_sizes = [t.max_size for t in file_types]
+    max_size = None if None in max_sizes else max(max_sizes)
+    allowed = [t.content_types for t in file_types]
+    content_types = None if None in allowed else frozenset().union(*allowed)
+    spool_max_size = min(t.spool_max_size or DEFAULT_SPOOL_MAX_SIZE for t in file_types)
+    if max_size is None and content_types is None and spool_max_size == DEFAULT_SPOOL_MAX_SIZE:
+        return None
+
+    def stream_factory(total_content_length, content_type, filename=None, content_length=None):
+        mimetype = (content_type or '').split(';')[0].strip().lower()
+        if content_types is not None and mimetype not in content_types:
+            return _DiscardFile()
+        if max_size is not None and content_length and content_length > max_size:
+            raise RequestEntityTooLarge(f"Uploaded file is larger than {max_size} bytes.")
+        return _LimitedSpooledFile(max_size, spool_max_size)
 
-        return value
+    return stream_factory
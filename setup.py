@@ -20,7 +20,12 @@ setup(
     python_requires=">=3.6",
     zip_safe=False,
     platforms='any',
-    install_requires=["Flask>=1.0", "pydantic>=1.2"],
+    install_requires=["Flask>=1.0", "pydantic>=1.8,<3"],
+    extras_require={
+        "orjson": ["orjson"],
+        "ujson": ["ujson>=5.4"],
+        "async": ["asgiref>=3.2"],
+    },
     classifiers=[
         # 'Development Status :: 1 - Planning',
         # 'Development Status :: 2 - Pre-Alpha',
@@ -0,0 +1,117 @@
+import time
+import threading
+from flask import Flask, g, request
+from flask.views import MethodView
+from pydantic import BaseModel
+from openapi import OpenApi, Batch
+
+
+class Query(BaseModel):
+    a: int
+
+
+def make_app(max_workers=None):
+    app = Flask(__name__)
+    openapi = OpenApi(app, batch=Batch(max_requests=5, max_workers=max_workers))
+
+    @app.get('/q')
+    @openapi.swagger()
+    def q(query: Query):
+        return {'a': query.a}
+
+    class Item(MethodView):
+        @openapi.swagger()
+        def get(self):
+            return {'method': 'get'}
+
+        def delete(self):
+            return {'method': 'delete'}
+
+    app.add_url_rule('/item', view_func=Item.as_view('item'))
+
+    class Body(BaseModel):
+        n: int
+        wait: float = 0
+
+    barrier = threading.Barrier(2, timeout=5)
+
+    @app.post('/body')
+    @openapi.swagger()
+    def body(body: Body):
+        time.sleep(body.wait)
+        g.n = getattr(g, 'n', 0) + body.n
+        return {'n': g.n, 'token': request.headers.get('X-Token')}
+
+    @app.get('/meet')
+    @openapi.swagger()
+    def meet():
+        barrier.wait()
+        return {'met': True}
+
+    @app.get('/plain')
+    def plain():
+        return 'plain'
+
+    return app
+
+
+def test_malformed_sub_request_answers_400_alone():
+    client = make_app().test_client()
+    subs = [{'path': '/q?a=2', 'query': {'a': 3}}, {'path': '/q', 'query': {'a': 1}}]
+    resp = client.post('/openapi/batch', json=subs)
+    assert resp.status_code == 200
+    assert [r['status'] for r in resp.json] == [400, 200]
+    assert resp.json[1]['body'] == {'a': 1}
+
+
+def test_undocumented_method_view_method_is_not_dispatched():
+    client = make_app().test_client()
+    resp = client.post('/openapi/batch', json=[{'path': '/item'}, {'path': '/item', 'method': 'DELETE'}])
+    assert [r['status'] for r in resp.json] == [200, 404]
+    assert resp.json[0]['body'] == {'method': 'get'}
+
+
+def test_responses_keep_the_order_of_the_sub_requests():
+    client = make_app().test_client()
+    subs = [{'method': 'POST', 'path': '/body', 'body': {'n': n}} for n in range(5)]
+    resp = client.post('/openapi/batch', json=subs, headers={'X-Token': 't'})
+    # each sub-request has its own `g`, the headers of the batch are passed on
+    assert [r['body'] for r in resp.json] == [{'n': n, 'token': 't'} for n in range(5)]
+    subs[2]['headers'] = {'X-Token': 'own'}
+    resp = client.post('/openapi/batch', json=subs, headers={'X-Token': 't'})
+    assert resp.json[2]['body']['token'] == 'own'
+
+
+def test_failed_sub_requests_answer_in_their_entry():
+    client = make_app().test_client()
+    subs = [
+        {'path': '/missing'},
+        {'path': '/plain'},
+        {'path': '/q', 'query': {'a': 'x'}},
+        {'method': 'POST', 'path': '/body', 'body': {}},
+        {'path': '/q?a=1'},
+    ]
+    resp = client.post('/openapi/batch', json=subs)
+    assert resp.status_code == 200
+    assert [r['status'] for r in resp.json] == [404, 404, 422, 422, 200]
+    assert resp.json[2]['body'][0]['loc'] == ['a']
+    assert resp.json[3]['body'][0]['loc'] == ['n']
+    assert resp.json[4]['body'] == {'a': 1}
+
+
+def test_batch_itself_is_validated():
+    client = make_app().test_client()
+    assert client.post('/openapi/batch', json=[{'path': '/q?a=1'}] * 6).status_code == 422
+    assert client.post('/openapi/batch', json={'path': '/q?a=1'}).status_code == 422
+
+
+def test_sub_requests_run_concurrently():
+    client = make_app(max_workers=2).test_client()
+    # each waits for the other one, one after the other they would time out
+    resp = client.post('/openapi/batch', json=[{'path': '/meet'}, {'path': '/meet'}])
+    assert [r['body'] for r in resp.json] == [{'met': True}] * 2
+
+    subs = [{'method': 'POST', 'path': '/body', 'body': {'n': 1, 'wait': 0.2}},
+            {'method': 'POST', 'path': '/body', 'body': {'n': 2}}]
+    resp = client.post('/openapi/batch', json=subs)
+    assert [r['body']['n'] for r in resp.json] == [1, 2]
@@ -0,0 +1,53 @@
+from typing import List
+import pytest
+from flask import Flask
+from pydantic import BaseModel, ValidationError
+from werkzeug.datastructures import MultiDict
+from openapi import OpenApi
+from openapi.binder import Binder, CachedValidationError
+from openapi.cache import LRUCache
+from openapi.compat import errors
+
+
+class Query(BaseModel):
+    a: int
+    tags: List[str] = []
+
+
+def test_cached_models_are_copies():
+    binder = Binder(Query, LRUCache(8))
+    source = MultiDict([('a', '1'), ('tags', 'x')])
+    first = binder.cached(b'a=1&tags=x', source)
+    first.tags.append('y')
+    assert binder.cached(b'a=1&tags=x', source).tags == ['x']
+    assert binder.cache.hits == 1
+
+
+def test_cached_errors_are_raised_anew():
+    binder = Binder(Query, LRUCache(8))
+    with pytest.raises(ValidationError) as first:
+        binder.cached(b'a=x', MultiDict([('a', 'x')]))
+    with pytest.raises(CachedValidationError) as second:
+        binder.cached(b'a=x', MultiDict([('a', 'x')]))
+    with pytest.raises(CachedValidationError) as third:
+        binder.cached(b'a=x', MultiDict([('a', 'x')]))
+    assert second.value is not third.value
+    assert second.value.errors == errors(first.value)
+    assert list(second.value.errors[0]['loc']) == ['a']
+
+
+def test_cached_errors_answer_422():
+    app = Flask(__name__)
+    openapi = OpenApi(app, metrics=True)
+
+    @app.get('/q')
+    @openapi.swagger(query_cache=8)
+    def q(query: Query):
+        return {'a': query.a}
+
+    client = app.test_client()
+    first, second = client.get('/q?a=x'), client.get('/q?a=x')
+    assert first.status_code == second.status_code == 422
+    assert first.json == second.json
+    assert client.get('/q?a=1').json == {'a': 1}
+    assert 'openapi_validation_errors_total{path="/q",method="GET",field="a"} 2' in openapi.metrics.render()
@@ -0,0 +1,91 @@
+from flask import Flask, request
+from pydantic import BaseModel
+from openapi import OpenApi
+from openapi.cache import ResponseCache
+from openapi.models.security import APIKey
+
+
+class Body(BaseModel):
+    x: int
+
+
+class Cookie(BaseModel):
+    sid: str
+
+
+def make_app():
+    app = Flask(__name__)
+    app.openapi = openapi = OpenApi(app)
+
+    @app.post('/echo')
+    @openapi.swagger(cache=ResponseCache(30))
+    def echo(body: Body):
+        return {'x': body.x}
+
+    @app.get('/me')
+    @openapi.swagger(cache=ResponseCache(30))
+    def me(cookie: Cookie):
+        return {'sid': cookie.sid, 'raw': request.cookies['sid']}
+
+    return app
+
+
+def test_body_is_part_of_the_key():
+    client = make_app().test_client()
+    assert client.post('/echo', json={'x': 1}).json == {'x': 1}
+    assert client.post('/echo', json={'x': 2}).json == {'x': 2}
+    assert client.post('/echo', json={'x': 1}).json == {'x': 1}
+
+
+def test_cookie_is_part_of_the_key():
+    client = make_app().test_client()
+    client.set_cookie('localhost', 'sid', 'alice')
+    resp = client.get('/me')
+    assert resp.json['sid'] == 'alice'
+    assert 'private' in resp.headers['Cache-Control']
+    assert 'Cookie' in resp.headers['Vary']
+
+    client.set_cookie('localhost', 'sid', 'bob')
+    resp = client.get('/me')
+    assert resp.json['sid'] == 'bob'
+    assert 'private' in resp.headers['Cache-Control']
+
+
+def test_cookie_keyed_policy_is_documented():
+    app = make_app()
+    headers = app.openapi.api_doc['paths']['/me']['get']['responses']['200']['headers']
+    assert headers['Cache-Control']['schema']['example'] == 'private, max-age=30'
+    assert headers['Vary']['schema']['example'] == 'Cookie'
+
+
+def make_secured_app():
+    app = Flask(__name__)
+    app.openapi = openapi = OpenApi(app, secutity={'token': APIKey(name='Authorization', **{'in': 'header'})})
+
+    @app.get('/whoami')
+    @openapi.swagger(cache=30)
+    def whoami():
+        return {'user': request.headers['Authorization']}
+
+    return app
+
+
+def test_credentials_are_part_of_the_key():
+    client = make_secured_app().test_client()
+    resp = client.get('/whoami', headers={'Authorization': 'alice'})
+    assert resp.json == {'user': 'alice'}
+    assert resp.headers['Cache-Control'] == 'private, max-age=30'
+    assert 'Authorization' in resp.headers['Vary']
+
+    resp = client.get('/whoami', headers={'Authorization': 'bob'})
+    assert resp.json == {'user': 'bob'}
+    assert resp.headers['Cache-Control'] == 'private, max-age=30'
+    assert client.get('/whoami', headers={'Authorization': 'alice'}).json == {'user': 'alice'}
+
+
+def test_secured_policy_is_documented():
+    app = make_secured_app()
+    operation = app.openapi.api_doc['paths']['/whoami']['get']
+    assert operation['responses']['200']['headers']['Cache-Control']['schema']['example'] == 'private, max-age=30'
+    assert operation['responses']['200']['headers']['Vary']['schema']['example'] == 'Authorization'
+    assert operation['x-cache']['private'] is True
@@ -0,0 +1,45 @@
+import json
+import pytest
+from flask import Flask, Blueprint
+from pydantic import BaseModel
+from openapi import OpenApi
+
+
+class Query(BaseModel):
+    n: int
+
+
+def make_app(**kwargs):
+    app = Flask(__name__)
+    openapi = OpenApi(app, **kwargs)
+    users = Blueprint('users', __name__)
+
+    @users.get('/users')
+    @openapi.swagger()
+    def list_users(query: Query):
+        return {}
+
+    @app.get('/health')
+    @openapi.swagger()
+    def health():
+        return {}
+
+    app.register_blueprint(users)
+    return app
+
+
+@pytest.mark.parametrize('ext', ['.json', '.yaml'])
+def test_exported_documents_are_served_as_api_doc_file(tmp_path, ext):
+    if ext == '.yaml':
+        pytest.importorskip('yaml')
+    output = str(tmp_path / f'openapi{ext}')
+    result = make_app().test_cli_runner().invoke(args=['openapi', 'export', '-o', output])
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / f'openapi.users{ext}').exists()
+
+    client = make_app(api_doc_file=output).test_client()
+    assert set(client.get('/openapi/openapi.json').json['paths']) == {'/users', '/health'}
+    resp = client.get('/openapi/blueprints/users.json')
+    assert resp.status_code == 200
+    assert list(json.loads(resp.data)['paths']) == ['/users']
+    assert client.get('/openapi/blueprints/other.json').status_code == 404
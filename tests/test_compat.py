@@ -0,0 +1,92 @@
+"""The document is the same on pydantic v1 and v2, both are compared to data/compat_api_doc.json"""
+import os
+import json
+from enum import Enum
+from typing import Dict, List, Optional
+from flask import Flask
+from pydantic import BaseModel, Field
+from openapi import OpenApi, Tag
+from openapi.models.security import APIKey
+from openapi.stream import Stream
+from openapi.validator import FileStorage
+
+EXPECTED = os.path.join(os.path.dirname(__file__), 'data', 'compat_api_doc.json')
+
+
+class Color(str, Enum):
+    red = 'red'
+    blue = 'blue'
+
+
+class Point(BaseModel):
+    x: float = Field(..., ge=0, le=10, description='abscissa')
+    y: float = 0
+
+
+class Shape(BaseModel):
+    name: str = Field(..., min_length=1, max_length=20, title='Name')
+    color: Color = Color.red
+    points: List[Point] = []
+    center: Optional[Point] = None
+    labels: Dict[str, int] = {}
+    ref: str = Field(None, alias='$ref')
+
+
+class Query(BaseModel):
+    page: int = Field(1, gt=0)
+    tags: List[str] = []
+    color: Optional[Color] = None
+
+
+class Path(BaseModel):
+    shape_id: int
+
+
+class Header(BaseModel):
+    x_token: str = Field(..., alias='X-Token')
+
+
+class Upload(BaseModel):
+    name: str
+    file: FileStorage
+
+
+class Result(BaseModel):
+    code: int
+    shape: Shape
+
+
+def make_app():
+    app = Flask(__name__)
+    openapi = OpenApi(app, secutity={'apikey': APIKey(**{'name': 'token', 'in': 'header'})})
+    tag = Tag(name='shapes')
+
+    @app.get('/shapes')
+    @openapi.swagger(tags=[tag], responses={'200': Stream[Shape]})
+    def shapes(query: Query):
+        return []
+
+    @app.post('/shapes/<int:shape_id>')
+    @openapi.swagger(tags=[tag], responses={'200': Result})
+    def update(path: Path, header: Header, body: Shape):
+        return {}
+
+    @app.post('/upload')
+    @openapi.swagger()
+    def upload(form: Upload):
+        return {}
+
+    @app.post('/points')
+    @openapi.swagger()
+    def points(body: Stream[Point]):
+        return {}
+
+    return openapi
+
+
+def test_document_is_the_same_on_pydantic_v1_and_v2():
+    openapi = make_app()
+    openapi.validate_api_doc()
+    with open(EXPECTED, encoding='utf-8') as f:
+        expected = json.load(f)
+    assert json.loads(json.dumps(openapi.api_doc)) == expected
@@ -0,0 +1,126 @@
+from typing import List
+import pytest
+from flask import Flask
+from pydantic import BaseModel
+from openapi import OpenApi
+from openapi.json_provider import JSONProvider
+from openapi.limits import RequestLimits
+from openapi.stream import Stream
+
+
+class Body(BaseModel):
+    data: list = []
+
+
+class Query(BaseModel):
+    a: List[int] = []
+
+
+class Item(BaseModel):
+    n: int
+
+
+class ShallowProvider(JSONProvider):
+    """Fails on deep nesting like orjson, with a ValueError"""
+    name = 'shallow'
+
+    def loads(self, data):
+        if data.count(b'[') > 1024:
+            raise ValueError('Recursion limit reached')
+        return super().loads(data)
+
+
+CHUNKED = {'headers': {'Transfer-Encoding': 'chunked'}, 'environ_overrides': {'wsgi.input_terminated': True}}
+
+
+def make_app(**kwargs):
+    app = Flask(__name__)
+    app.openapi = openapi = OpenApi(app, **kwargs)
+    limits = RequestLimits(max_body_size=100, max_items=3, max_depth=3, max_query_params=3, max_query_repeats=2,
+                           max_item_size=12)
+
+    @app.post('/body')
+    @openapi.swagger(limits=limits)
+    def body(query: Query, body: Body):
+        return {'a': query.a, 'data': body.data}
+
+    @app.post('/deep')
+    @openapi.swagger(limits=RequestLimits(max_depth=3))
+    def deep(body: Body):
+        return {'data': body.data}
+
+    @app.post('/stream')
+    @openapi.swagger(limits=limits)
+    def stream(body: Stream[Item]):
+        return {'n': [item.n for item in body]}
+
+    return app
+
+
+def error_type(resp):
+    assert resp.status_code == 422
+    return resp.json[0]['type']
+
+
+def test_within_the_limits():
+    client = make_app().test_client()
+    resp = client.post('/body?a=1&a=2', json={'data': [1, [2, 3]]})
+    assert resp.json == {'a': [1, 2], 'data': [1, [2, 3]]}
+
+
+def test_body_size():
+    client = make_app().test_client()
+    resp = client.post('/body', json={'data': ['x' * 100]})
+    assert resp.status_code == 413
+    # sent without Content-Length, read up to the limit only
+    resp = client.post('/body', data=b'{"data": ["' + b'x' * 100 + b'"]}', content_type='application/json',
+                       **CHUNKED)
+    assert resp.status_code == 413
+    resp = client.post('/body', data=b'{"data": [1]}', content_type='application/json', **CHUNKED)
+    assert resp.json == {'a': [], 'data': [1]}
+
+
+def test_body_shape():
+    client = make_app().test_client()
+    assert error_type(client.post('/body', json={'data': [[[1]]]})) == 'value_error.limit.depth'
+    assert error_type(client.post('/body', json={'data': [1, 2, 3, 4]})) == 'value_error.limit.items'
+
+
+@pytest.mark.parametrize('json_provider', [None, ShallowProvider()])
+def test_deep_body(json_provider):
+    client = make_app(json_provider=json_provider).test_client()
+    data = b'{"data": ' + b'[' * 5000 + b']' * 5000 + b'}'
+    resp = client.post('/deep', data=data, content_type='application/json')
+    assert error_type(resp) == 'value_error.limit.depth'
+    # too deep to tell whether it is valid
+    resp = client.post('/deep', data=b'{"data": ' + b'[' * 5000, content_type='application/json')
+    assert error_type(resp) == 'value_error.limit.depth'
+    # invalid, like a missing body
+    resp = client.post('/deep', data=b'{"data": [[1],', content_type='application/json')
+    assert resp.json == {'data': []}
+
+
+def test_query():
+    client = make_app().test_client()
+    assert error_type(client.post('/body?a=1&b=2&c=3&d=4', json={})) == 'value_error.limit.query_params'
+    assert error_type(client.post('/body?a=1&a=2&a=3', json={})) == 'value_error.limit.query_repeats'
+
+
+def test_stream_body():
+    client = make_app().test_client()
+    assert client.post('/stream', json=[{'n': 1}, {'n': 2}]).json == {'n': [1, 2]}
+    assert error_type(client.post('/stream', json=[{'n': 1}] * 4)) == 'value_error.limit.items'
+    assert client.post('/stream', json=[{'n': 1}] * 30).status_code == 413
+    # sent without Content-Length, the stream stops past max_body_size
+    resp = client.post('/stream', data=b'[' + b' ' * 100 + b']', content_type='application/json', **CHUNKED)
+    assert resp.status_code == 413
+    resp = client.post('/stream', data=b'[' + b' ' * 90 + b']', content_type='application/json', **CHUNKED)
+    assert resp.json == {'n': []}
+
+
+def test_limits_are_documented():
+    spec = make_app().openapi.api_doc
+    assert spec['paths']['/body']['post']['x-limits'] == {
+        'maxBodySize': 100, 'maxItems': 3, 'maxDepth': 3, 'maxQueryParams': 3, 'maxQueryRepeats': 2,
+        'maxItemSize': 12,
+    }
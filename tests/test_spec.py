@@ -0,0 +1,44 @@
+from flask import Flask
+from pydantic import BaseModel
+from openapi import OpenApi, Tag
+from openapi.models.security import APIKey
+
+
+class Query(BaseModel):
+    a: str = 'a'
+
+
+class Body(BaseModel):
+    b: int
+
+
+def make_app(**kwargs):
+    app = Flask(__name__)
+    app.openapi = openapi = OpenApi(app, **kwargs)
+    tag = Tag(name='items', description='Items')
+
+    @app.get('/')
+    @openapi.swagger(tags=[tag, 'plain'])
+    def index(query: Query):
+        return {}
+
+    @app.post('/items')
+    @openapi.swagger(tags=[tag], security=[{'apikey': ['write']}])
+    def items(body: Body):
+        return {}
+
+    return app
+
+
+def test_tags_are_listed_by_name():
+    doc = make_app().openapi.validate_api_doc()
+    assert doc.paths['/'].get.tags == ['items', 'plain']
+
+
+def test_security_requirements_are_valid():
+    app = make_app(secutity={'apikey': APIKey(**{'name': 'token', 'in': 'header'})})
+    app.openapi.validate_api_doc()
+    paths = app.openapi.api_doc['paths']
+    assert paths['/']['get']['security'] == [{'apikey': []}]
+    assert paths['/items']['post']['security'] == [{'apikey': ['write']}]
+    assert app.openapi.api_doc['components']['securitySchemes']['apikey']['name'] == 'token'
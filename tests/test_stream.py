@@ -0,0 +1,139 @@
+import io
+import json
+import pytest
+from flask import Flask
+from pydantic import BaseModel
+from openapi import OpenApi
+from openapi.compat import errors
+from openapi.stream import Stream, StreamValidationError
+
+
+class Item(BaseModel):
+    n: int
+
+
+def make_app(**kwargs):
+    app = Flask(__name__)
+    app.openapi = openapi = OpenApi(app, **kwargs)
+
+    @app.post('/double')
+    @openapi.swagger(responses={'200': Stream[Item]})
+    def double(body: Stream[Item]):
+        return ({'n': item.n * 2} for item in body)
+
+    return app
+
+
+def test_streamed_response_of_a_stream_body():
+    client = make_app().test_client()
+    resp = client.post('/double', json=[{'n': 1}, {'n': 2}])
+    assert resp.status_code == 200
+    assert resp.json == [{'n': 2}, {'n': 4}]
+
+
+def test_invalid_stream_body_ends_the_streamed_response_with_an_error_record():
+    app = make_app(metrics=True)
+    client = app.test_client()
+    resp = client.post('/double', json=[{'n': 1}, {'n': 'x'}, {'n': 3}])
+    assert resp.status_code == 200
+    items = resp.json
+    assert items[0] == {'n': 2}
+    assert items[-1]['errors'][0]['loc'] == [1, 'n']
+    assert len(items) == 2
+    metric = 'openapi_validation_errors_total{path="/double",method="POST",field="n"} 1'
+    assert metric in app.openapi.metrics.render()
+
+    resp = client.post('/double', data='{"n": 1}\n{"n": \n', content_type='application/x-ndjson',
+                       headers={'Accept': 'application/x-ndjson'})
+    lines = [json.loads(line) for line in resp.data.splitlines()]
+    assert lines[0] == {'n': 2}
+    assert lines[-1]['errors'][0]['msg'] == 'Invalid JSON'
+
+
+def read(data, chunk_size=None, ndjson=False, **kwargs):
+    stream = Stream[Item](io.BytesIO(data), ndjson=ndjson, **kwargs)
+    if chunk_size is not None:
+        stream.chunk_size = chunk_size
+    return stream
+
+
+ARRAY = b' [ {"n": 1}, {"n": -22} ,{"n": 333}, {"n": 4e0}]\n'
+NDJSON = b'{"n": 1}\n\n{"n": -22}\r\n {"n": 333}\n{"n": 4}'
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 8, 64 * 1024])
+@pytest.mark.parametrize('data, ndjson', [(ARRAY, False), (NDJSON, True)])
+def test_items_are_parsed_across_chunk_boundaries(data, ndjson, chunk_size):
+    assert [item.n for item in read(data, chunk_size, ndjson)] == [1, -22, 333, 4]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 64 * 1024])
+def test_strings_are_parsed_across_chunk_boundaries(chunk_size):
+    class Named(BaseModel):
+        name: str
+
+    data = '[{"name": "é\\"]中"}, {"name": "-Infinity"}]'.encode()
+    stream = Stream[Named](io.BytesIO(data))
+    stream.chunk_size = chunk_size
+    assert [item.name for item in stream] == ['é"]中', '-Infinity']
+
+
+@pytest.mark.parametrize('data, ndjson', [(b'[]', False), (b' [ ]\n', False), (b'', True), (b'\n \n', True)])
+def test_empty_bodies(data, ndjson):
+    assert list(read(data, ndjson=ndjson)) == []
+
+
+@pytest.mark.parametrize('chunk_size', [1, 64 * 1024])
+@pytest.mark.parametrize('data, index', [
+    (b'', 0),
+    (b'{"n": 1}', 0),
+    (b'[{"n": 1} {"n": 2}]', 1),
+    (b'[{"n": 1},]', 1),
+    (b'[{"n": 1}, {"n": 2}', 2),
+    (b'[{"n": 1}, {"n": ', 1),
+    (b'[{"n": 1}] x', 1),
+    (b'[{"n": 1}, nul]', 1),
+])
+def test_malformed_arrays(data, index, chunk_size):
+    stream = read(data, chunk_size)
+    with pytest.raises(StreamValidationError) as info:
+        list(stream)
+    assert list(errors(info.value)[0]['loc']) == [index]
+    assert errors(info.value)[0]['msg'] == 'Invalid JSON'
+
+
+@pytest.mark.parametrize('chunk_size', [1, 64 * 1024])
+def test_malformed_ndjson_line(chunk_size):
+    stream = read(b'{"n": 1}\n{"n": 2\n{"n": 3}\n', chunk_size, ndjson=True)
+    items = iter(stream)
+    assert next(items).n == 1
+    with pytest.raises(StreamValidationError) as info:
+        next(items)
+    assert list(errors(info.value)[0]['loc']) == [1]
+
+
+def test_invalid_item_and_iter_valid():
+    data = b'[{"n": 1}, {"n": "x"}, {"n": 3}]'
+    with pytest.raises(StreamValidationError) as info:
+        list(read(data))
+    assert list(errors(info.value)[0]['loc']) == [1, 'n']
+
+    stream = read(data)
+    assert [item.n for item in stream.iter_valid()] == [1, 3]
+    assert [list(e['loc']) for e in stream.errors] == [[1, 'n']]
+
+
+@pytest.mark.parametrize('ndjson', [False, True])
+def test_item_limits(ndjson):
+    data = NDJSON if ndjson else ARRAY
+    with pytest.raises(StreamValidationError) as info:
+        list(read(data, ndjson=ndjson, max_items=2))
+    assert errors(info.value)[0]['type'] == 'value_error.limit.items'
+    assert list(errors(info.value)[0]['loc']) == [2]
+
+    large = b'{"n": 1}\n{"n": 100000000000}' if ndjson else b'[{"n": 1}, {"n": 100000000000}]'
+    with pytest.raises(StreamValidationError) as info:
+        list(read(large, 2, ndjson=ndjson, max_item_size=12))
+    assert errors(info.value)[0]['type'] == 'value_error.limit.item_size'
+    assert list(errors(info.value)[0]['loc']) == [1]
+    assert list(read(data, 2, ndjson=ndjson, max_item_size=12)) != []
@@ -0,0 +1,71 @@
+import json
+from typing import List
+from flask import Flask
+from pydantic import BaseModel
+from openapi import OpenApi
+from openapi.trusted import Trusted, sign, construct
+
+
+class Item(BaseModel):
+    n: int
+
+
+class Body(BaseModel):
+    name: str
+    items: List[Item] = []
+
+
+def make_app(trusted):
+    app = Flask(__name__)
+    openapi = OpenApi(app)
+
+    @app.post('/items')
+    @openapi.swagger(trusted=trusted)
+    def items(body: Body):
+        return {'name': body.name, 'items': [item.n for item in body.items], 'type': type(body.items[0]).__name__}
+
+    return app
+
+
+# not valid, only a trusted request gets it through to the view
+BODY = json.dumps({'name': 'a', 'items': [{'n': 'not a number'}]}).encode()
+
+
+def post(client, signature=None):
+    headers = {'X-Openapi-Signature': signature} if signature is not None else {}
+    return client.post('/items', data=BODY, content_type='application/json', headers=headers)
+
+
+def test_signed_request_is_not_validated():
+    client = make_app(Trusted(secret='s3cret')).test_client()
+    resp = post(client, sign('s3cret', 'POST', '/items', BODY))
+    assert resp.status_code == 200
+    assert resp.json == {'name': 'a', 'items': ['not a number'], 'type': 'Item'}
+
+
+def test_unsigned_or_missigned_request_is_validated():
+    client = make_app(Trusted(secret='s3cret')).test_client()
+    assert post(client).status_code == 422
+    assert post(client, '').status_code == 422
+    assert post(client, sign('other', 'POST', '/items', BODY)).status_code == 422
+    assert post(client, sign('s3cret', 'PUT', '/items', BODY)).status_code == 422
+    assert post(client, sign('s3cret', 'POST', '/items', b'{}')).status_code == 422
+    assert post(client, 'é' * 64).status_code == 422
+
+
+def test_without_secret_every_request_is_trusted():
+    client = make_app(True).test_client()
+    assert post(client).status_code == 200
+
+
+def test_validate_rate_still_validates(caplog):
+    client = make_app(Trusted(validate_rate=1)).test_client()
+    assert post(client).status_code == 200
+    assert 'Trusted body validation failed' in caplog.text
+
+
+def test_construct_builds_nested_models():
+    body = construct(Body, {'name': 'a', 'items': [{'n': 1}, {'n': 2}]})
+    assert isinstance(body.items[1], Item)
+    assert body.items[1].n == 2
+    assert construct(Body, {'name': 'b'}).items == []